@@ -35,10 +35,14 @@ async def adder_randomised_test(dut):
         )
 
 
-def adder_runner():
+def adder_runner(build_dir="sim_build", build_only=False, **test_options):
     """Simulate the adder example using the Python runner.
 
     This file can be run directly or via pytest discovery.
+
+    build_dir, build_only and test_options (extra runner.test() arguments,
+    such as testcase, seed or results_xml) let common/regression.py reuse
+    this runner.
     """
     hdl_toplevel_lang = os.getenv("HDL_TOPLEVEL_LANG", "vhdl")
     sim = os.getenv("SIM", "ghdl")
@@ -57,27 +61,35 @@ def adder_runner():
 
     # equivalent to setting the PYTHONPATH environment variable
     sys.path.append(str(proj_path / "tests"))
+    # shared runner helpers (build cache, waveforms)
+    sys.path.append(str(proj_path.parent / "common"))
+    from build_cache import cached_build
+    from waveforms import trim_waveform, waveform_plusargs
     
     
     # https://docs.cocotb.org/en/stable/library_reference.html#cocotb.runner.get_runner
     runner = get_runner(sim)
 
     # https://docs.cocotb.org/en/stable/library_reference.html#cocotb.runner.Simulator.build
-    runner.build(
+    cached_build(
+        runner,
+        build_dir=build_dir,
         verilog_sources=verilog_sources,
         vhdl_sources=vhdl_sources,
         hdl_toplevel="adder",
-        always=True,
     )
 
-    
-    WaveformOptionVcd = "--vcd=Lab01_waveforms.vcd"
+    # waveforms are off by default, see common/waveforms.py (WAVES=vcd|ghw|fst)
+    WaveformOptions = waveform_plusargs("Lab01_waveforms", "adder", build_dir)
 
     # https://docs.cocotb.org/en/stable/library_reference.html#cocotb.runner.Simulator.test
     #runner.test(hdl_toplevel="adder", test_module="test_adder_solution")
-    #runner.test(hdl_toplevel="adder", test_module="test_adder_solution", test_args=WaveformOptionVcd,)
-    #runner.test(hdl_toplevel="adder", test_module="test_adder_solution", test_args=[WaveformOptionVcd],)
-    runner.test(hdl_toplevel="adder", test_module="test_adder_solution", plusargs=[WaveformOptionVcd])
+    #runner.test(hdl_toplevel="adder", test_module="test_adder_solution", test_args=WaveformOptions,)
+    if build_only:
+        return None
+    results_xml = runner.test(hdl_toplevel="adder", hdl_toplevel_lang=hdl_toplevel_lang, test_module="test_adder_solution", plusargs=WaveformOptions, build_dir=build_dir, **test_options)
+    trim_waveform(results_xml.parent, "Lab01_waveforms")
+    return results_xml
 
 
 if __name__ == "__main__":
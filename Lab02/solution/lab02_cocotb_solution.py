@@ -47,15 +47,17 @@ async def sqrt_test(dut):
 
 
 
-def simulation_runner():
+def simulation_runner(build_dir="sim_build", build_only=False, **test_options):
     """Simulate the adder example using the Python runner.
 
     This file can be run directly or via pytest discovery.
+
+    build_dir, build_only and test_options (extra runner.test() arguments,
+    such as testcase, seed or results_xml) let common/regression.py reuse
+    this runner.
     """
     hdl_toplevel_lang = "vhdl"
     simulator_program = "ghdl"
-	
-    WaveformOptionVcd = "--vcd=Lab02_waveforms.vcd"
 
     proj_path = Path(__file__).resolve().parent.parent
 
@@ -64,18 +66,34 @@ def simulation_runner():
 
     # equivalent to setting the PYTHONPATH environment variable
     sys.path.append(str(proj_path / "solution"))
+    # shared runner helpers (build cache, waveforms)
+    sys.path.append(str(proj_path.parent / "common"))
+    from build_cache import cached_build
+    from waveforms import trim_waveform, waveform_plusargs
 
     runner = get_runner(simulator_program)
 	
-    runner.build(
+    cached_build(
+        runner,
+        build_dir=build_dir,
         vhdl_sources=vhdl_sources,
         hdl_toplevel="square_root",
-        always=True,
     )
 	
-    runner.test(hdl_toplevel="square_root", 
+    if build_only:
+        return None
+
+    # waveforms are off by default, see common/waveforms.py (WAVES=vcd|ghw|fst)
+    WaveformOptions = waveform_plusargs("Lab02_waveforms", "square_root", build_dir)
+
+    results_xml = runner.test(hdl_toplevel="square_root", 
+				hdl_toplevel_lang=hdl_toplevel_lang,
 				test_module="lab02_cocotb_solution",
-				plusargs=[WaveformOptionVcd, "--ieee-asserts=disable"])
+				plusargs=WaveformOptions + ["--ieee-asserts=disable"],
+				build_dir=build_dir,
+				**test_options)
+    trim_waveform(results_xml.parent, "Lab02_waveforms")
+    return results_xml
 
 
 if __name__ == "__main__":
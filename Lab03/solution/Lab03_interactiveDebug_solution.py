@@ -8,15 +8,16 @@ from cocotb.runner import get_runner
 from cocotb.triggers import Timer
 from cocotb.clock import Clock
 
-import debugpy
+# shared helpers of the labs, in the common directory at the repository root
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent / "common"))
+from debug_attach import attach_debugger
 
 # cocotb decorator indicating a test to run with simulator.
 # multiple tests may be included in the same python module (file)
 @cocotb.test()
 async def sqrt_test(dut):
-    debugpy.listen(5678)
-    debugpy.wait_for_client()
-    debugpy.breakpoint()
+    # run with DEBUGPY=start to wait for the debugger client and break here
+    attach_debugger()
 
     test_value = 4
     expected_result = 2
@@ -47,15 +48,17 @@ async def sqrt_test(dut):
 
 
 
-def simulation_runner():
+def simulation_runner(build_dir="sim_build", build_only=False, **test_options):
     """Simulate the adder example using the Python runner.
 
     This file can be run directly or via pytest discovery.
+
+    build_dir, build_only and test_options (extra runner.test() arguments,
+    such as testcase, seed or results_xml) let common/regression.py reuse
+    this runner.
     """
     hdl_toplevel_lang = "vhdl"
     simulator_program = "ghdl"
-	
-    WaveformOptionVcd = "--vcd=Lab03_waveforms.vcd"
 
     proj_path = Path(__file__).resolve().parent.parent
 
@@ -64,18 +67,34 @@ def simulation_runner():
 
     # equivalent to setting the PYTHONPATH environment variable
     sys.path.append(str(proj_path / "solution"))
+    # shared runner helpers (build cache, waveforms)
+    sys.path.append(str(proj_path.parent / "common"))
+    from build_cache import cached_build
+    from waveforms import trim_waveform, waveform_plusargs
 
     runner = get_runner(simulator_program)
 	
-    runner.build(
+    cached_build(
+        runner,
+        build_dir=build_dir,
         vhdl_sources=vhdl_sources,
         hdl_toplevel="square_root",
-        always=True,
     )
 	
-    runner.test(hdl_toplevel="square_root", 
+    if build_only:
+        return None
+
+    # waveforms are off by default, see common/waveforms.py (WAVES=vcd|ghw|fst)
+    WaveformOptions = waveform_plusargs("Lab03_waveforms", "square_root", build_dir)
+
+    results_xml = runner.test(hdl_toplevel="square_root", 
+				hdl_toplevel_lang=hdl_toplevel_lang,
 				test_module="Lab03_interactiveDebug_solution",
-				plusargs=[WaveformOptionVcd, "--ieee-asserts=disable"])
+				plusargs=WaveformOptions + ["--ieee-asserts=disable"],
+				build_dir=build_dir,
+				**test_options)
+    trim_waveform(results_xml.parent, "Lab03_waveforms")
+    return results_xml
 
 
 if __name__ == "__main__":
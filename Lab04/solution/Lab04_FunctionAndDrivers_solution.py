@@ -6,8 +6,6 @@ import random
 import sys
 from pathlib import Path
 
-import debugpy
-
 import cocotb
 from cocotb.runner import get_runner
 from cocotb.triggers import Timer
@@ -15,38 +13,49 @@ from cocotb.clock import Clock
 
 from cocotbext.uart import UartSource, UartSink
 
+# shared helpers of the labs, in the common directory at the repository root
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent / "common"))
+from debug_attach import attach_debugger
+from fast_forward import fast_forward_cycles
+from timing_config import timing_from_env
+
 
 
 async def init(dut):
-    c = Clock(dut.clk, 100, 'ns')
+    # same clock as the runner configured the UARTs for
+    period_ns = timing_from_env().clock_period_ns
+    c = Clock(dut.clk, period_ns, 'ns')
     await cocotb.start(c.start())
 
 
     dut.rx_uart_serial_in.value = 1
     dut.reset.value = 1
-    await cocotb.triggers.ClockCycles(dut.clk, 10, rising=True)
+    await fast_forward_cycles(dut.clk, 10, period_ns)
     dut.reset.value = 0
-    await cocotb.triggers.ClockCycles(dut.clk, 10, rising=True)
+    await fast_forward_cycles(dut.clk, 10, period_ns)
     return
 
 
 
 async def PostTestDelay(dut):
-    await cocotb.triggers.ClockCycles(dut.clk, 10, rising=True)
+    # idle cycles: one timer instead of a wake-up per clock edge
+    period_ns = timing_from_env().clock_period_ns
+    await fast_forward_cycles(dut.clk, 10, period_ns)
     dut.reset.value = 1
-    await cocotb.triggers.ClockCycles(dut.clk, 4, rising=True)
+    await fast_forward_cycles(dut.clk, 4, period_ns)
     return
 
 # cocotb decorator indicating a test to run with simulator.
 # multiple tests may be included in the same python module (file)
 @cocotb.test()
 async def sqrt_test(dut):
-    #debugpy.listen(5678)
-    #debugpy.wait_for_client()
-    #debugpy.breakpoint()
+    # with DEBUGPY=start, wait for the debugger client and break here
+    attach_debugger()
 
-    uart_driver = UartSource(dut.rx_uart_serial_in, baud=1000000, bits=8)
-    uart_sink   = UartSink(dut.tx_uart_serial_out, baud=1000000, bits=8)
+    # baud rate matching the g_CLKS_PER_BIT generic, see common/timing_config.py
+    timing = timing_from_env()
+    uart_driver = UartSource(dut.rx_uart_serial_in, baud=timing.baud, bits=8)
+    uart_sink   = UartSink(dut.tx_uart_serial_out, baud=timing.baud, bits=8)
 
 
     await init(dut)
@@ -57,21 +66,23 @@ async def sqrt_test(dut):
         await uart_driver.wait()
         result = await uart_sink.read(count=1)
         RecoveredValue = int.from_bytes(result, "little")
-        print(RecoveredValue)
+        dut._log.info("Recovered value: %d", RecoveredValue)
 
     # wait at the end
     await PostTestDelay(dut)
 
 
-def simulation_runner():
+def simulation_runner(build_dir="sim_build", build_only=False, **test_options):
     """Simulate the adder example using the Python runner.
 
     This file can be run directly or via pytest discovery.
+
+    build_dir, build_only and test_options (extra runner.test() arguments,
+    such as testcase, seed or results_xml) let common/regression.py reuse
+    this runner.
     """
     hdl_toplevel_lang = "vhdl"
     simulator_program = "ghdl"
-	
-    WaveformOptionVcd = "--vcd=Lab04_waveforms.vcd"
 
     proj_path = Path(__file__).resolve().parent.parent
 
@@ -83,18 +94,41 @@ def simulation_runner():
 
     # equivalent to setting the PYTHONPATH environment variable
     sys.path.append(str(proj_path / "solution"))
+    # shared runner helpers (build cache, timing, waveforms)
+    sys.path.append(str(proj_path.parent / "common"))
+    from build_cache import cached_build
+    from timing_config import timing_profile
+    from waveforms import trim_waveform, waveform_plusargs
 
     runner = get_runner(simulator_program)
+    # clock period and UART bit length of the toplevel and of the tests,
+    # see common/timing_config.py (RT2024_TIMING=fast)
+    timing = timing_profile()
 	
-    runner.build(
+    cached_build(
+        runner,
+        build_dir=build_dir,
         vhdl_sources=vhdl_sources,
         hdl_toplevel="rt2024mysystemtop",
-        always=True,
+        parameters=timing.parameters(),
     )
 	
-    runner.test(hdl_toplevel="rt2024mysystemtop", 
+    if build_only:
+        return None
+
+    # waveforms are off by default, see common/waveforms.py (WAVES=vcd|ghw|fst)
+    WaveformOptions = waveform_plusargs("Lab04_waveforms", "rt2024mysystemtop", build_dir)
+
+    results_xml = runner.test(hdl_toplevel="rt2024mysystemtop", 
+				hdl_toplevel_lang=hdl_toplevel_lang,
 				test_module="Lab04_FunctionAndDrivers_solution",
-				plusargs=[WaveformOptionVcd, "--ieee-asserts=disable"])
+				plusargs=WaveformOptions + ["--ieee-asserts=disable"],
+				build_dir=build_dir,
+				parameters=timing.parameters(),
+				extra_env=timing.env(),
+				**test_options)
+    trim_waveform(results_xml.parent, "Lab04_waveforms")
+    return results_xml
 
 
 if __name__ == "__main__":
@@ -5,8 +5,6 @@ import sys
 import math
 from pathlib import Path
 
-import debugpy
-
 import cocotb
 from cocotb.runner import get_runner
 from cocotb.triggers import Timer
@@ -14,6 +12,10 @@ from cocotb.clock import Clock
 from cocotbext.uart import UartSource, UartSink
 from cocotb.log import SimLog
 
+# shared helpers of the labs, in the common directory at the repository root
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent / "common"))
+from timing_config import timing_from_env
+
 # Example class. Copy-paste section from the previous labs in the methods
 # Add the "self." keyword where appropriate (i.e. : self.dut.Signal).
 class BaseEnvironment:
@@ -21,6 +23,8 @@ class BaseEnvironment:
         # keep pointer to dut in class
         self.dut = dut
         self.log = SimLog("cocotb.base.%s" % (type(self).__qualname__))
+        # clock period and baud rate set by the runner, see common/timing_config.py
+        self.timing = timing_from_env()
 
     # Common sequence for all tests
     async def run(self):
@@ -33,15 +37,15 @@ class BaseEnvironment:
     def BuildEnvironment(self):
         # put the UART driver and sink declarations here as objects
         # self.UARTUnit = UartSource(...) 
-        self.uart_driver = UartSource(self.dut.rx_uart_serial_in, baud=1000000, bits=8)
-        self.uart_sink   = UartSink(self.dut.tx_uart_serial_out, baud=1000000, bits=8)
+        self.uart_driver = UartSource(self.dut.rx_uart_serial_in, baud=self.timing.baud, bits=8)
+        self.uart_sink   = UartSink(self.dut.tx_uart_serial_out, baud=self.timing.baud, bits=8)
     
     # Initialize dut signals, clock and run the reset sequence
     async def InitSignalsClockAndReset(self):
         self.dut.rx_uart_serial_in.value = 1
         self.dut.reset.value = 1
         
-        self.c = Clock(self.dut.clk, 100, 'ns')
+        self.c = Clock(self.dut.clk, self.timing.clock_period_ns, 'ns')
         await cocotb.start(self.c.start())
         
         ## delay for reset
@@ -118,15 +122,17 @@ async def RandomTest(dut):
     
     
 # Runner, same as in previous labs.
-def simulation_runner():
+def simulation_runner(build_dir="sim_build", build_only=False, **test_options):
     """Simulate the adder example using the Python runner.
 
     This file can be run directly or via pytest discovery.
+
+    build_dir, build_only and test_options (extra runner.test() arguments,
+    such as testcase, seed or results_xml) let common/regression.py reuse
+    this runner.
     """
     hdl_toplevel_lang = "vhdl"
     simulator_program = "ghdl"
-	
-    WaveformOptionVcd = "--vcd=Lab05_waveforms.vcd"
 
     proj_path = Path(__file__).resolve().parent.parent
 
@@ -138,18 +144,41 @@ def simulation_runner():
 
     # equivalent to setting the PYTHONPATH environment variable
     sys.path.append(str(proj_path / "solution"))
+    # shared runner helpers (build cache, timing, waveforms)
+    sys.path.append(str(proj_path.parent / "common"))
+    from build_cache import cached_build
+    from timing_config import timing_profile
+    from waveforms import trim_waveform, waveform_plusargs
 
     runner = get_runner(simulator_program)
+    # clock period and UART bit length of the toplevel and of the tests,
+    # see common/timing_config.py (RT2024_TIMING=fast)
+    timing = timing_profile()
 
-    runner.build(
+    cached_build(
+        runner,
+        build_dir=build_dir,
         vhdl_sources=vhdl_sources,
         hdl_toplevel="rt2024mysystemtop",
-        always=True,
+        parameters=timing.parameters(),
     )
 
-    runner.test(hdl_toplevel="rt2024mysystemtop", 
+    if build_only:
+        return None
+
+    # waveforms are off by default, see common/waveforms.py (WAVES=vcd|ghw|fst)
+    WaveformOptions = waveform_plusargs("Lab05_waveforms", "rt2024mysystemtop", build_dir)
+
+    results_xml = runner.test(hdl_toplevel="rt2024mysystemtop", 
+        hdl_toplevel_lang=hdl_toplevel_lang,
         test_module="Lab05_ObjectOrientedProgramming_solution",
-        plusargs=[WaveformOptionVcd, "--ieee-asserts=disable"])
+        plusargs=WaveformOptions + ["--ieee-asserts=disable"],
+        build_dir=build_dir,
+        parameters=timing.parameters(),
+        extra_env=timing.env(),
+        **test_options)
+    trim_waveform(results_xml.parent, "Lab05_waveforms")
+    return results_xml
 
 
 if __name__ == "__main__":
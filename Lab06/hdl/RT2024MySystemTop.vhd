@@ -10,6 +10,9 @@ use ieee.numeric_std.all;
  
  
 entity rt2024mysystemtop is
+	generic(
+		g_CLKS_PER_BIT  : integer := 10     -- clocks per UART bit, set by the runner (common/timing_config.py)
+	);
 	port(
 		clk             : in std_logic;
 		reset           : in std_logic;
@@ -82,7 +85,7 @@ begin
 
 inst_rx_uart : UART_RX 
   generic map (
-    g_CLKS_PER_BIT => 10     -- for 115kbps with 10 Mhz clock
+    g_CLKS_PER_BIT => g_CLKS_PER_BIT     -- 10 for 1 Mbps with a 10 MHz clock
     )
   port map(
     i_Clk       => clk,
@@ -93,7 +96,7 @@ inst_rx_uart : UART_RX
 	
 inst_tx_uart : UART_TX
   generic map(
-    g_CLKS_PER_BIT => 10
+    g_CLKS_PER_BIT => g_CLKS_PER_BIT
     )
   port map(
     i_Clk       => clk,
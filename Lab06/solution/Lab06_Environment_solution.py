@@ -0,0 +1,493 @@
+# 
+import os
+import random
+import sys
+import math
+from pathlib import Path
+
+import cocotb
+from cocotb.runner import get_runner
+from cocotb.triggers import Timer
+from cocotb.clock import Clock
+from cocotb.queue import Queue
+from cocotbext.uart import UartSource, UartSink
+from cocotb.log import SimLog
+from cocotb.utils import get_sim_steps
+
+from Lab06_MMC_Sqrt_solution import EdgeDataValidMonitor, attach_sqrt_checkers, np
+
+# shared helpers of the labs, in the common directory at the repository root
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent / "common"))
+from functional_coverage import CoverageCollector, closure_stimulus, even_ranges
+from debug_attach import attach_debugger, break_on_failure
+from fast_forward import fast_forward_cycles
+from log_control import apply_log_levels
+from phase_profiler import PhaseProfiler
+from timing_config import timing_from_env
+from txn_recorder import TransactionRecorder
+from waveforms import waveform_window_start, waveform_window_stop
+
+# Verification environment and test classes of Lab06, shared by the test
+# modules Lab06_MainEnvironment_solution and _fixCrossover: they only declare
+# the cocotb tests and the runner, and the crossover fix of the second one.
+
+# Example class. Copy-paste section from the previous labs in the methods
+# Add the "self." keyword where appropriate (i.e. : self.dut.Signal).
+class BaseEnvironment:
+    # extra idle clock cycles after each argument of TransactPipelined (the
+    # 2 stop bits of the driver already leave time to transmit each result)
+    GapCycles = 0
+    # arguments of TransactPipelined sent ahead of their result
+    InFlightWindow = 2
+    # bound on the wait for one result of TransactPipelined, in UART frames
+    # per argument in flight (scaled by the bit time of the timing profile)
+    ResultTimeoutFrames = 4
+    # bits of a UART frame of the driver: start, 8 data and 2 stop bits
+    FrameBits = 11
+    # "uart": serial UART frames on the toplevel ports, "backdoor": the
+    # received byte and the result are driven and sampled on the internal
+    # signals around the square root, without the serial bit timing.
+    # Default: RT2024_TRANSPORT, else "uart"
+    Transport = None
+    # clock cycles of the reset sequence
+    ResetCycles = 10
+    # check mode of the MMC_sqrt checkers: "transaction" fails on the first
+    # mismatch, "batch" checks chunks of results (long runs)
+    Check = "transaction"
+    # sampling engine of the checker monitors, "edge" or "shared" (one
+    # ClockSampler on the toplevel clock); None: chosen by attach_sqrt_checkers
+    CheckerEngine = None
+
+    def __init__(self, dut):
+        # keep pointer to dut in class
+        self.dut = dut
+        self.log = SimLog("cocotb.base.%s" % (type(self).__qualname__))
+        # clock period and baud rate set by the runner, see common/timing_config.py
+        self.timing = timing_from_env()
+        # per-component verbosity, from RT2024_LOG_LEVELS (see common/log_control.py)
+        apply_log_levels()
+        # sim time and wall time of each phase, see common/phase_profiler.py
+        self.profiler = PhaseProfiler("%s.%s" % (type(self).__module__, type(self).__qualname__))
+        # argument and result coverage, see common/functional_coverage.py
+        self.coverage = CoverageCollector(self.profiler.name)
+        # binary record of the transactions, with RT2024_RECORD_DIR (see common/txn_recorder.py)
+        self.recorder = TransactionRecorder.from_env(self.profiler.name)
+        self.Transport = self.Transport or os.getenv("RT2024_TRANSPORT", "uart")
+        if self.Transport not in ("uart", "backdoor"):
+            raise ValueError(f"transport {self.Transport!r}: expected uart or backdoor")
+
+    # Common sequence for all tests
+    async def run(self):
+        # with DEBUGPY=start, wait for the debugger client and break here
+        attach_debugger()
+        try:
+            with self.profiler.phase("BuildEnvironment"):
+                self.BuildEnvironment()
+            with self.profiler.phase("InitSignalsClockAndReset"):
+                await self.InitSignalsClockAndReset()
+            with self.profiler.phase("StartEnvironment"):
+                self.StartEnvironment()
+            # with WAVES_WINDOW=events, only the test phase is kept in the waveform
+            waveform_window_start()
+            # with DEBUGPY=failure, a failed check breaks into the debugger
+            with self.profiler.phase("test"), break_on_failure():
+                await self.test()
+            waveform_window_stop()
+            with self.profiler.phase("postTest"):
+                await self.postTest()
+        finally:
+            # also reported when the test fails
+            self.profiler.report(self.log)
+            self.profiler.write_json()
+            self.coverage.report(self.log)
+            self.coverage.write()
+            if self.recorder:
+                self.recorder.close()
+    
+    # put drivers here (UART)
+    def BuildEnvironment(self):
+        # known clock period of the monitors: they do not spend the first
+        # cycles of the test measuring it
+        self.PeriodSteps = get_sim_steps(self.timing.clock_period_ns, "ns")
+        # put the UART driver and sink declarations here as objects
+        # self.UARTUnit = UartSource(...) 
+        if self.Transport == "backdoor":
+            self.BuildBackdoor()
+        else:
+            # 2 stop bits: 11 bits per argument, more than the 10 bits and 2
+            # clock cycles the transmitter takes per result, so arguments can
+            # be sent back to back
+            self.uart_driver = UartSource(self.dut.rx_uart_serial_in, baud=self.timing.baud, bits=8, stop_bits=2)
+            self.uart_sink   = UartSink(self.dut.tx_uart_serial_out, baud=self.timing.baud, bits=8)
+        # task.log.setLevel(logging.DEBUG)
+        # or without code change: RT2024_LOG_LEVELS=cocotb.rt2024mysystemtop.rx_uart_serial_in=DEBUG
+        # one checker per square_root instance of the design; instances on
+        # the toplevel clock share one sampling coroutine
+        self.checkers = attach_sqrt_checkers(
+            self.dut, clk=self.dut.clk, profiler=self.profiler,
+            period=self.PeriodSteps, check=self.Check, engine=self.CheckerEngine,
+        )
+        self.inst_MMC_Sqrt = self.checkers[0]
+        self.BuildCoverage()
+        if self.recorder:
+            self.BuildRecorder()
+
+    # Backdoor transport: the arguments are deposited on the outputs of the
+    # UART receiver, which keep a deposited value while the serial input is
+    # idle (its registers are assigned without changing). The results are
+    # sampled on the input of the UART transmitter.
+    def BuildBackdoor(self):
+        self.result_mon = EdgeDataValidMonitor(
+            clk=self.dut.clk,
+            datas=dict(Result=self.dut.sqrt_res),
+            valid=self.dut.sqrt_res_ready,
+            record="slots",
+            period=self.PeriodSteps,
+        )
+        # the square root ignores arguments while it computes: one argument
+        # every latency + 1 cycles
+        self.BackdoorGapCycles = len(self.dut.inst_square_root.arg) // 2
+
+    # Coverage of the sqrt arguments (value bins and 4 ranges) and results,
+    # sampled by the monitors of all the checkers
+    def BuildCoverage(self):
+        for checker in self.checkers:
+            ArgWidth = len(checker.inst_Sqrt.arg)
+            Arguments = self.coverage.add_point(
+                "argument", ArgWidth, ranges=even_ranges(ArgWidth, 4)
+            )
+            Results = self.coverage.add_point("result", len(checker.inst_Sqrt.sqrt_res))
+            self.coverage.hook(checker.input_mon, "Argument", Arguments)
+            self.coverage.hook(checker.output_mon, "SqrtResult", Results)
+        
+    # Streams of the recorder: each checker's arguments and results, for an
+    # offline replay of the checks, and the UART bytes
+    def BuildRecorder(self):
+        for checker in self.checkers:
+            Instance = checker.inst_Sqrt._path
+            self.recorder.hook(checker.input_mon, Instance + ".input", ["Argument"])
+            self.recorder.hook(checker.output_mon, Instance + ".output", ["SqrtResult"])
+        self.UartTxStream = self.recorder.stream("uart.tx", ["Byte"])
+        self.UartRxStream = self.recorder.stream("uart.rx", ["Byte"])
+
+    def StartEnvironment(self):
+        for checker in self.checkers:
+            checker.start()
+        if self.Transport == "backdoor":
+            self.result_mon.start()
+    
+    # Initialize dut signals, clock and run the reset sequence
+    async def InitSignalsClockAndReset(self):
+        self.dut.rx_uart_serial_in.value = 1
+        self.dut.reset.value = 1
+        
+        self.c = Clock(self.dut.clk, self.timing.clock_period_ns, 'ns')
+        await cocotb.start(self.c.start())
+        
+        ## delay for reset
+        await self.WaitCycles(self.ResetCycles)
+        
+        ## release reset
+        self.dut.reset.value = 0
+        await self.WaitCycles(2)
+        
+        
+    # Idle wait of Cycles clock cycles: one timer, then a realignment on the
+    # clock, instead of a wake-up per edge (see common/fast_forward.py)
+    async def WaitCycles(self, Cycles):
+        await fast_forward_cycles(self.dut.clk, Cycles, self.timing.clock_period_ns)
+
+    # Virtual function, forces to use derived class.
+    async def test(self):
+        # Mimmick C++ Pure virtual function. 
+        raise NotImplementedError()
+
+    # Put anything happening at the end of the simulation here.
+    # for the lab, a delay followed by rising the reset.
+    async def postTest(self):
+        await self.WaitCycles(10)
+        self.dut.reset.value = 1
+        await self.WaitCycles(2)
+        # with Check = "batch", stop() also checks the results of the last
+        # chunk: fewer than chunk_size results are only checked here
+        for checker in self.checkers:
+            checker.stop()
+        if self.Transport == "backdoor":
+            self.result_mon.stop()
+        
+    # Wrapper around driver, to send values to the dut.
+    async def SendValue(self, ValueToDut):
+        with self.profiler.call("SendValue"):
+            if self.recorder:
+                self.recorder.record(self.UartTxStream, [ValueToDut])
+            if self.Transport == "backdoor":
+                await self.DepositValue(ValueToDut)
+                return
+            await self.uart_driver.write(ValueToDut.to_bytes(1, "little"))
+            await self.uart_driver.wait()
+
+    # Backdoor driver: one valid cycle of the received byte, then the
+    # cycles of the computation
+    async def DepositValue(self, ValueToDut):
+        self.dut.rx_uart_data.value = ValueToDut
+        self.dut.rx_uart_data_valid.value = 1
+        await cocotb.triggers.RisingEdge(self.dut.clk)
+        self.dut.rx_uart_data_valid.value = 0
+        await cocotb.triggers.ClockCycles(self.dut.clk, self.BackdoorGapCycles, rising=True)
+    
+    # Read back the value and convert to integer.
+    async def ReadResult(self):
+        with self.profiler.call("ReadResult"):
+            if self.Transport == "backdoor":
+                result_int = (await self.result_mon.values.get())["Result"]
+            else:
+                # result_BytesArray = await self.???.read(count=1)
+                result_BytesArray = await self.uart_sink.read(count=1)
+                result_bytes = bytes(result_BytesArray)
+                result_int = int.from_bytes(result_bytes, "little")
+            if self.recorder:
+                self.recorder.record(self.UartRxStream, [result_int])
+        return result_int
+
+    # Bulk wrapper: all the values (list or numpy array) in one write.
+    async def SendValues(self, ValuesToDut):
+        with self.profiler.call("SendValues"):
+            if np is not None and isinstance(ValuesToDut, np.ndarray):
+                # astype wraps out of range values: reject them as bytes() does
+                if ValuesToDut.size and (ValuesToDut.min() < 0 or ValuesToDut.max() > 255):
+                    raise ValueError("bytes must be in range(0, 256)")
+                Payload = ValuesToDut.astype(np.uint8, copy=False).tobytes()
+            else:
+                Payload = bytes(ValuesToDut)
+            if self.recorder:
+                for Value in Payload:
+                    self.recorder.record(self.UartTxStream, [Value])
+            if self.Transport == "backdoor":
+                for Value in Payload:
+                    await self.DepositValue(Value)
+                return
+            await self.uart_driver.write(Payload)
+            await self.uart_driver.wait()
+
+    # Read back count values, as they arrive, in a preallocated buffer.
+    # Returns a numpy array of uint8 when numpy is installed, else a list.
+    async def ReadResults(self, count):
+        with self.profiler.call("ReadResults"):
+            Buffer = bytearray(count)
+            Received = 0
+            if self.Transport == "backdoor":
+                for Index in range(count):
+                    Buffer[Index] = (await self.result_mon.values.get())["Result"]
+                Received = count
+            while Received < count:
+                # read(0) waits for a result without taking it: read_nowait
+                # fails when asked for more values than are queued
+                await self.uart_sink.read(count=0)
+                Data = self.uart_sink.read_nowait(min(count - Received, self.uart_sink.count()))
+                Buffer[Received:Received + len(Data)] = Data
+                Received += len(Data)
+            if self.recorder:
+                for Value in Buffer:
+                    self.recorder.record(self.UartRxStream, [Value])
+        if np is not None:
+            return np.frombuffer(Buffer, dtype=np.uint8)
+        return list(Buffer)
+
+    # Pipelined transactions: a producer sends the arguments while the
+    # consumer reads the results, so the reception of an argument overlaps
+    # the computation and transmission of the previous results.
+    # Returns the results, in the order of Values.
+    async def TransactPipelined(self, Values, Window=None):
+        Window = Window or self.InFlightWindow
+        InFlight = Queue(maxsize=Window)
+        Timeout_ns = self.FramesTime_ns(self.ResultTimeoutFrames * Window)
+        Producer = cocotb.start_soon(self.SendPipelined(Values, InFlight))
+        Results = []
+        try:
+            for _ in range(len(Values)):
+                Results.append(await cocotb.triggers.with_timeout(
+                    self.ReadResult(), Timeout_ns, "ns"
+                ))
+                # results come back in order: the oldest argument is answered
+                InFlight.get_nowait()
+        finally:
+            Producer.kill()
+        return Results
+
+    # Duration of Frames UART frames with the bit time of the timing profile
+    def FramesTime_ns(self, Frames):
+        return Frames * self.FrameBits * self.timing.bit_time_ns
+
+    # Producer of TransactPipelined, blocks while the window is full
+    async def SendPipelined(self, Values, InFlight):
+        for Value in Values:
+            await InFlight.put(Value)
+            await self.SendValue(Value)
+            if self.GapCycles:
+                await cocotb.triggers.ClockCycles(self.dut.clk, self.GapCycles, rising=True)
+
+
+class DirectedTestClass(BaseEnvironment):
+    async def test(self):
+        TestValues = [4, 9, 16, 50]
+        ExpectedValues = [2, 3, 4, 7]
+        # the sink queues the results while the next values are sent
+        await self.SendValues(TestValues)
+        DutResponses = await self.ReadResults(len(TestValues))
+        for DutResponse, Expected in zip(DutResponses, ExpectedValues):
+            assert DutResponse == Expected
+
+class RandomTestClass(BaseEnvironment):
+    # also the transaction count of the common/benchmark.py workload
+    Transactions = 5
+
+    async def test(self):
+        RandomValues = [random.randint(0, 255) for x in range(0, self.Transactions)]
+
+        await self.SendValues(RandomValues)
+        DutResponses = await self.ReadResults(len(RandomValues))
+        for RandomValue, DutResponse in zip(RandomValues, DutResponses):
+            Expected = math.sqrt(RandomValue)
+            Expected = math.floor(Expected)
+            assert DutResponse == Expected
+
+class CoverageDrivenTestClass(BaseEnvironment):
+    # the test ends when this percentage of the argument values is covered
+    CoverageTarget = 100.0
+
+    async def test(self):
+        Arguments = self.coverage.points["argument"]
+        for Value in closure_stimulus(Arguments, self.CoverageTarget):
+            Expected = self.inst_MMC_Sqrt.model(Value)
+
+            await self.SendValue(Value)
+            DutResponse = await self.ReadResult()
+            assert DutResponse == Expected
+        self.log.info(
+            "coverage closure after %d transactions: %s",
+            Arguments.samples, Arguments.summary(),
+        )
+        assert Arguments.percent() >= self.CoverageTarget
+
+class PipelinedRandomTestClass(BaseEnvironment):
+    # long randomized run, at close to the UART line rate
+    Transactions = 1000
+    Check = "batch"
+
+    async def test(self):
+        Arguments = [random.randint(0, 255) for _ in range(self.Transactions)]
+        DutResponses = await self.TransactPipelined(Arguments)
+
+        Expected = self.inst_MMC_Sqrt.model_batch(Arguments)
+        Failed = [
+            (Argument, Response, int(Value))
+            for Argument, Response, Value in zip(Arguments, DutResponses, Expected)
+            if Response != Value
+        ]
+        for Argument, Response, Value in Failed[:10]:
+            self.log.error("argument %d: result %d, expected %d", Argument, Response, Value)
+        assert not Failed, "%d of %d results failed" % (len(Failed), len(Arguments))
+
+class BackdoorRandomTestClass(PipelinedRandomTestClass):
+    # the pipelined random run, on the backdoor transport: the datapath
+    # checks without the UART bit timing. A class of its own, so that its
+    # profile, coverage and record files are not those of PipelinedRandomTest
+    Transport = "backdoor"
+
+class SweepTestClass(BaseEnvironment):
+    # bound on the time to receive the last results, after the last byte
+    # sent, in UART frames (scaled by the bit time of the timing profile)
+    DrainTimeoutFrames = 8
+
+    async def test(self):
+        # all 2**N arguments of the square root, N from the instance width
+        Width = len(self.dut.inst_square_root.arg)
+        assert Width <= 8, "one UART byte per argument, got %d bits" % Width
+        Arguments = list(range(2**Width))
+
+        # results are collected while the next arguments are sent
+        Reader = cocotb.start_soon(self.ReadResults(len(Arguments)))
+        await self.SendValues(Arguments)
+        DutResponses = await cocotb.triggers.with_timeout(
+            Reader, self.FramesTime_ns(self.DrainTimeoutFrames), "ns"
+        )
+
+        Expected = self.inst_MMC_Sqrt.model_batch(Arguments)
+        Bitmap, Mismatches = self.MismatchBitmap(Arguments, DutResponses, Expected)
+        self.log.info("sweep of %d arguments: %d mismatches", len(Arguments), Mismatches)
+        if Mismatches:
+            # bit i of the bitmap (little endian) is set when argument i failed
+            self.log.error("mismatch bitmap: %s", Bitmap.hex())
+        assert Mismatches == 0
+
+    @staticmethod
+    def MismatchBitmap(arguments, responses, expected):
+        if np is not None:
+            failed = np.asarray(arguments)[
+                np.asarray(responses) != np.asarray(expected)
+            ]
+        else:
+            failed = [a for a, r, e in zip(arguments, responses, expected) if r != e]
+        bitmap = bytearray((len(arguments) + 7) // 8)
+        for argument in failed:
+            bitmap[argument // 8] |= 1 << (argument % 8)
+        return bitmap, len(failed)
+
+
+# Runner of the Lab06 test modules, same as in previous labs.
+def run_simulation(test_module, build_dir="sim_build", build_only=False, **test_options):
+    """Build the Lab06 toplevel, then run the cocotb tests of test_module.
+
+    build_dir, build_only and test_options (extra runner.test() arguments,
+    such as testcase, seed or results_xml) are those of the simulation_runner
+    of the test modules.
+    """
+    hdl_toplevel_lang = "vhdl"
+    simulator_program = "ghdl"
+
+    proj_path = Path(__file__).resolve().parent.parent
+
+    vhdl_sources = []
+    vhdl_sources += [proj_path / "hdl" / "uart_rx.vhd"]
+    vhdl_sources += [proj_path / "hdl" / "uart_tx.vhd"]
+    vhdl_sources += [proj_path / "hdl" / "sqrt_conv.vhd"]
+    vhdl_sources += [proj_path / "hdl" / "RT2024MySystemTop.vhd"]
+
+    # equivalent to setting the PYTHONPATH environment variable
+    sys.path.append(str(proj_path / "solution"))
+    # shared runner helpers (build cache, timing, waveforms)
+    sys.path.append(str(proj_path.parent / "common"))
+    from build_cache import cached_build
+    from timing_config import timing_profile
+    from waveforms import trim_waveform, waveform_plusargs
+
+    runner = get_runner(simulator_program)
+    # clock period and UART bit length of the toplevel and of the tests,
+    # see common/timing_config.py (RT2024_TIMING=fast)
+    timing = timing_profile()
+
+    cached_build(
+        runner,
+        build_dir=build_dir,
+        vhdl_sources=vhdl_sources,
+        hdl_toplevel="rt2024mysystemtop",
+        parameters=timing.parameters(),
+    )
+
+    if build_only:
+        return None
+
+    # waveforms are off by default, see common/waveforms.py (WAVES=vcd|ghw|fst)
+    WaveformOptions = waveform_plusargs("Lab06_waveforms", "rt2024mysystemtop", build_dir)
+
+    results_xml = runner.test(hdl_toplevel="rt2024mysystemtop", 
+        hdl_toplevel_lang=hdl_toplevel_lang,
+        test_module=test_module,
+        plusargs=WaveformOptions + ["--ieee-asserts=disable"],
+        build_dir=build_dir,
+        parameters=timing.parameters(),
+        extra_env=timing.env(),
+        **test_options)
+    trim_waveform(results_xml.parent, "Lab06_waveforms")
+    return results_xml
+
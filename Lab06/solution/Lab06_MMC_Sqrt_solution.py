@@ -3,25 +3,148 @@
 # modified from the cocotb main repository, v1.8.1
 #    cocotb\examples\matrix_multiplier\tests
 
+import functools
 import math
 import os
 import sys
+from array import array
+from collections import Counter, namedtuple
 from pathlib import Path
 from random import getrandbits
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 import cocotb
 from cocotb.binary import BinaryValue
 from cocotb.clock import Clock
-from cocotb.handle import SimHandleBase
-from cocotb.queue import Queue
+from cocotb.handle import RegionObject, SimHandleBase
+from cocotb.queue import Queue, QueueFull
 from cocotb.runner import get_runner
-from cocotb.triggers import RisingEdge
+from cocotb.triggers import Event, RisingEdge, Timer
+from cocotb.utils import get_sim_time
 from cocotb.log import SimLog
 
+# shared helpers of the labs, in the common directory at the repository root
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent / "common"))
+from debug_attach import break_on_failure
+from log_control import SampledLog, SummaryLog
+from sqrt_check import check_transaction, latency_cycles
+from txn_recorder import UNKNOWN
 
+try:
+    import numpy as np
+except ImportError:
+    # optional, the batch model then works on lists
+    np = None
 
-# reused from the cocotb repo, unmodified. Added some inline comments
+# arguments up to this width are tabulated (2**16 entries), wider ones
+# use the cached isqrt below
+MAX_TABLE_WIDTH = 16
+
+# widest data signal of a RingQueue: its values are stored as signed 64-bit
+# ints, and -2**63 (UNKNOWN, as in the transaction records) is X/Z
+MAX_RING_WIDTH = 63
+
+# exact integer square root, cached for the widths too large to tabulate
+cached_isqrt = functools.lru_cache(maxsize=2**16)(math.isqrt)
+
+
+@functools.lru_cache(maxsize=None)
+def isqrt_table(width: int):
+    """
+    Return the exact integer square roots of 0 .. 2**width - 1.
+
+    Built once per width with math.isqrt (floating point sqrt is not exact
+    above 2**52), as a numpy array when numpy is installed, a list otherwise.
+    """
+    table = [math.isqrt(value) for value in range(2**width)]
+    if np is not None:
+        return np.array(table, dtype=np.uint32)
+    return table
+
+
+@functools.lru_cache(maxsize=None)
+def transaction_record(names):
+    """
+    Return the compact record class of the transactions with these fields.
+
+    A tuple with __slots__ = (), readable by position, by attribute
+    (record.Argument) and by name (record["Argument"], as the dict records).
+    """
+
+    class Transaction(namedtuple("Transaction", names)):
+        __slots__ = ()
+
+        def __getitem__(self, key):
+            if isinstance(key, str):
+                return getattr(self, key)
+            return tuple.__getitem__(self, key)
+
+    return Transaction
+
+
+def sample_int(handle: SimHandleBase) -> Optional[int]:
+    """Return the value of a handle as an int, None if it has X/Z/U bits."""
+    try:
+        return handle.value.integer
+    except ValueError:
+        return None
+
+
+class RingQueue(Queue):
+    """
+    cocotb Queue of transaction records, stored as ints in a preallocated ring
+
+    Args
+        record: record class of the items, from transaction_record()
+        capacity: initial number of records of the ring, doubled when full
+        maxsize: as for Queue, 0 for unbounded
+
+    Nothing is retained per queued transaction but its integers: a record
+    is only built again by get(). None values are stored as UNKNOWN, values
+    must fit in MAX_RING_WIDTH bits.
+    """
+
+    def __init__(self, record, capacity: int = 1024, maxsize: int = 0):
+        self._record = record
+        self._fields = len(record._fields)
+        self._capacity = capacity
+        super().__init__(maxsize)
+
+    def _init(self, maxsize):
+        self._ring = array("q", bytes(8 * self._fields * self._capacity))
+        self._head = 0
+        self._count = 0
+
+    def _grow(self):
+        # unroll the ring in a twice larger one
+        head = self._head * self._fields
+        ring = self._ring[head:] + self._ring[:head]
+        ring.extend(array("q", bytes(8 * len(ring))))
+        self._ring, self._head, self._capacity = ring, 0, 2 * self._capacity
+
+    def _put(self, item):
+        if self._count == self._capacity:
+            self._grow()
+        base = ((self._head + self._count) % self._capacity) * self._fields
+        for offset, value in enumerate(item):
+            self._ring[base + offset] = UNKNOWN if value is None else value
+        self._count += 1
+
+    def _get(self):
+        base = self._head * self._fields
+        values = self._ring[base : base + self._fields]
+        self._head = (self._head + 1) % self._capacity
+        self._count -= 1
+        return self._record._make(None if value == UNKNOWN else value for value in values)
+
+    def qsize(self) -> int:
+        return self._count
+
+    def empty(self) -> bool:
+        return not self._count
+
+
+# reused from the cocotb repo. Added some inline comments, and compact records
 class DataValidMonitor:
     """
     Reusable Monitor of one-way control flow (data/valid) streaming data interface
@@ -30,10 +153,38 @@ class DataValidMonitor:
         clk: clock signal
         valid: control signal noting a transaction occured
         datas: named handles to be sampled when transaction occurs
+        record: transaction representation in the values queue
+            "dict": dict of BinaryValue, by data name (the original cocotb one)
+            "slots": compact transaction_record() of ints, readable by name too
+            "ring": same records, queued as ints in a preallocated RingQueue
+                    (data signals up to MAX_RING_WIDTH bits)
+        capacity: initial number of transactions of the "ring" queue
+        maxsize: bound of the values queue, 0 for unbounded
+        overflow: what happens to a transaction sampled when the queue is full
+            "block": the monitor waits for the consumer, and misses the
+                     transactions occuring meanwhile
+            "drop_oldest": the oldest queued transaction is dropped
+            "fail": QueueFull is raised, failing the test
+
+        timestamps: add a "time" field to each transaction, the simulation
+            time in steps of a clock edge of its valid cycle (which edge
+            depends on the engine, it is the same for all its monitors)
+
+    high_water (largest queue size seen) and dropped (transactions dropped)
+    are kept for the end of test statistics. The functions in callbacks are
+    called with each sampled transaction, before it is queued.
     """
 
     def __init__(
-        self, clk: SimHandleBase, datas: Dict[str, SimHandleBase], valid: SimHandleBase
+        self,
+        clk: SimHandleBase,
+        datas: Dict[str, SimHandleBase],
+        valid: SimHandleBase,
+        record: str = "dict",
+        capacity: int = 1024,
+        maxsize: int = 0,
+        overflow: str = "fail",
+        timestamps: bool = False,
     ):
         # Queue object, manages values sampled when valid == 1
         # Using a python dictionary is not required here, but
@@ -41,7 +192,38 @@ class DataValidMonitor:
         #     See example in main cocotb git repository for
         #     example with multiple sample values using this dictionary approach 
         #     cocotb\examples\matrix_multiplier\tests
-        self.values = Queue[Dict[str, int]]()
+        if record == "dict":
+            self._record = None
+            self.values = Queue[Dict[str, int]](maxsize)
+        elif record in ("slots", "ring"):
+            # the int conversion is done once, at sample time
+            self._record = transaction_record(
+                tuple(datas) + (("time",) if timestamps else ())
+            )
+            if record == "ring":
+                for name, handle in datas.items():
+                    if len(handle) > MAX_RING_WIDTH:
+                        raise ValueError(
+                            f"{name} is {len(handle)} bits wide, record='ring' "
+                            f"stores at most {MAX_RING_WIDTH} bits"
+                        )
+                self.values = RingQueue(self._record, capacity, maxsize)
+            else:
+                self.values = Queue(maxsize)
+        else:
+            raise ValueError(f"record={record!r}: expected dict, slots or ring")
+        if overflow not in ("block", "drop_oldest", "fail"):
+            raise ValueError(f"overflow={overflow!r}: expected block, drop_oldest or fail")
+        self._overflow = overflow
+        self.high_water = 0
+        self.dropped = 0
+        self._timestamps = timestamps
+        # time of the sample being taken, set by the sampling engine
+        self._time = 0
+        self.callbacks = []
+        self.log = SimLog("cocotb.base.%s" % (type(self).__qualname__))
+        # per-transaction messages, see common/log_control.py
+        self._sample_log = SampledLog(self.log)
         # dut clock
         self._clk = clk
         # link to signals containing data, passed to the constructor. 
@@ -84,7 +266,44 @@ class DataValidMonitor:
                 continue
             
             # Valid/enable was '1'. Store data in the queue.
-            self.values.put_nowait(self._sample())
+            if self._timestamps:
+                self._time = get_sim_time("step")
+            blocked = self._store(self._sample())
+            if blocked is not None:
+                await self._put_blocked(blocked)
+
+    def _store(self, transaction):
+        """
+        Queue a sampled transaction, applying the overflow policy.
+
+        Returns the transaction when the queue is full with the "block"
+        policy: the caller then awaits values.put() with it.
+        """
+        for callback in self.callbacks:
+            callback(transaction)
+        self._sample_log.debug("sampled %s", transaction)
+        values = self.values
+        if values.full():
+            if self._overflow == "block":
+                return transaction
+            if self._overflow == "fail":
+                raise QueueFull(
+                    f"{values.qsize()} transactions queued, is the consumer stalled?"
+                )
+            values.get_nowait()
+            self.dropped += 1
+        values.put_nowait(transaction)
+        self._update_high_water()
+        return None
+
+    async def _put_blocked(self, transaction) -> None:
+        """Wait for room in the queue for a transaction returned by _store()."""
+        await self.values.put(transaction)
+        self._update_high_water()
+
+    def _update_high_water(self) -> None:
+        if self.values.qsize() > self.high_water:
+            self.high_water = self.values.qsize()
 
     def _sample(self) -> Dict[str, Any]:
         """
@@ -94,7 +313,217 @@ class DataValidMonitor:
         """
         # but this works for the simple "enable == 1" case. So
         # no modifications for the RT2024 workshop
-        return {name: handle.value for name, handle in self._datas.items()}
+        if self._record is None:
+            sample = {name: handle.value for name, handle in self._datas.items()}
+            if self._timestamps:
+                sample["time"] = self._time
+            return sample
+        values = [sample_int(handle) for handle in self._datas.values()]
+        if self._timestamps:
+            values.append(self._time)
+        return self._record._make(values)
+
+
+class EdgeDataValidMonitor(DataValidMonitor):
+    """
+    DataValidMonitor engine with fewer simulator callbacks per transaction
+
+    Same arguments and same values queue as DataValidMonitor, plus
+        period: clock period in simulator steps (default: measured on the
+            first two clock edges, then available as the period attribute;
+            valid is watched meanwhile, no transaction is missed)
+
+    Instead of one callback per clock cycle, the engine sleeps until the
+    rising edge of valid, samples, then checks valid again in the middle
+    of each following cycle: 2 callbacks for a one-cycle transaction, none
+    while the interface is idle. Meant for registered interfaces, where
+    data is updated by the same clock edge as valid, never after it.
+    """
+
+    def __init__(
+        self,
+        clk: SimHandleBase,
+        datas: Dict[str, SimHandleBase],
+        valid: SimHandleBase,
+        period: Optional[int] = None,
+        **options,
+    ):
+        super().__init__(clk=clk, datas=datas, valid=valid, **options)
+        self.period = period
+
+    async def _measure_period(self) -> None:
+        # two clock edges, once for the whole simulation
+        await RisingEdge(self._clk)
+        start = get_sim_time("step")
+        await RisingEdge(self._clk)
+        self.period = get_sim_time("step") - start
+
+    async def _run(self) -> None:
+        # measured alongside the wait on valid: a transaction in the first
+        # cycles is not missed
+        measure = cocotb.start_soon(self._measure_period()) if self.period is None else None
+
+        while True:
+            await RisingEdge(self._valid)
+            # valid rose just after this clock edge
+            self._time = get_sim_time("step")
+            # data changed no later than valid: already settled here
+            blocked = self._store(self._sample())
+            if blocked is not None:
+                await self._put_blocked(blocked)
+
+            # valid still '1' in the next cycles: back-to-back transactions,
+            # checked from the middle of the next cycle
+            if self.period is None:
+                # measured by the next clock edge, before the middle of the cycle
+                await measure
+                middle = self._time + self.period + self.period // 2
+                await Timer(middle - get_sim_time("step"), "step")
+            else:
+                await Timer(self.period + self.period // 2, "step")
+            while self._valid.value.binstr == "1":
+                # sampled mid-cycle, timed at the clock edge starting the cycle
+                self._time += self.period
+                blocked = self._store(self._sample())
+                if blocked is not None:
+                    await self._put_blocked(blocked)
+                await Timer(self.period, "step")
+
+
+class ClockSampler:
+    """
+    One clock-driven sampling coroutine, shared by all the monitors of a clock
+
+    Use ClockSampler.for_clock(clk): there is a single sampler per clock.
+    At each rising edge, the valid signal of every registered monitor is
+    read, and the monitors with valid '1' sample their transaction. The
+    clock period is measured from the first two edges.
+    """
+
+    _samplers = {}
+
+    @classmethod
+    def for_clock(cls, clk: SimHandleBase) -> "ClockSampler":
+        sampler = cls._samplers.get(clk._path)
+        if sampler is None:
+            sampler = cls._samplers[clk._path] = cls(clk)
+        return sampler
+
+    def __init__(self, clk: SimHandleBase):
+        self._clk = clk
+        self._monitors = []
+        self._coro = None
+        self.period = None
+
+    def add(self, monitor) -> None:
+        if self._coro is None or self._coro.done():
+            # killed with the previous test: forget its monitors
+            self._monitors = []
+            self._coro = cocotb.start_soon(self._run())
+        self._monitors.append(monitor)
+
+    def remove(self, monitor) -> None:
+        self._monitors.remove(monitor)
+        if not self._monitors:
+            self._coro.kill()
+            self._coro = None
+
+    async def _run(self) -> None:
+        last = None
+        while True:
+            await RisingEdge(self._clk)
+            now = get_sim_time("step")
+            # measured while sampling: the first edge is sampled too
+            if self.period is None and last is not None:
+                self.period = now - last
+            last = now
+            for monitor in self._monitors:
+                if monitor._valid.value.binstr == "1":
+                    monitor._time = now
+                    monitor._store(monitor._sample())
+
+
+class SharedClockMonitor(DataValidMonitor):
+    """
+    DataValidMonitor sampled by the ClockSampler of its clock
+
+    Same arguments and same values queue as DataValidMonitor, except the
+    "block" overflow policy: a monitor cannot stall the shared sampler.
+    The period argument, in simulator steps, sets the period of a new
+    sampler instead of measuring it.
+    Many monitors on one clock cost one coroutine and one callback per
+    cycle in total, instead of one coroutine each.
+    """
+
+    def __init__(
+        self,
+        clk: SimHandleBase,
+        datas: Dict[str, SimHandleBase],
+        valid: SimHandleBase,
+        period: Optional[int] = None,
+        **options,
+    ):
+        if options.get("overflow") == "block":
+            raise ValueError("overflow='block' is not supported with a shared clock sampler")
+        super().__init__(clk=clk, datas=datas, valid=valid, **options)
+        self._sampler = ClockSampler.for_clock(clk)
+        if self._sampler.period is None:
+            self._sampler.period = period
+
+    @property
+    def period(self) -> Optional[int]:
+        """Clock period in simulator steps, once measured."""
+        return self._sampler.period
+
+    def start(self) -> None:
+        """Start monitor"""
+        if self._coro is not None:
+            raise RuntimeError("Monitor already started")
+        self._sampler.add(self)
+        self._coro = self._sampler
+
+    def stop(self) -> None:
+        """Stop monitor"""
+        if self._coro is None:
+            raise RuntimeError("Monitor never started")
+        self._sampler.remove(self)
+        self._coro = None
+
+
+class LatencyHistogram:
+    """Counts of transaction latencies, in clock cycles"""
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def add(self, cycles: int) -> None:
+        self.counts[cycles] += 1
+
+    def __len__(self):
+        return sum(self.counts.values())
+
+    def percentile(self, percent: float) -> int:
+        """Smallest latency of at least percent % of the transactions."""
+        rank = math.ceil(len(self) * percent / 100)
+        seen = 0
+        for cycles in sorted(self.counts):
+            seen += self.counts[cycles]
+            if seen >= max(rank, 1):
+                return cycles
+        raise ValueError("empty histogram")
+
+    def summary(self) -> Dict[str, Any]:
+        if not self.counts:
+            return dict(count=0)
+        return dict(
+            count=len(self),
+            min=min(self.counts),
+            max=max(self.counts),
+            p50=self.percentile(50),
+            p90=self.percentile(90),
+            p99=self.percentile(99),
+            histogram=dict(sorted(self.counts.items())),
+        )
 
 
 class MMC_sqrt:
@@ -103,30 +532,113 @@ class MMC_sqrt:
 
     Args
         matrix_multiplier_entity: handle to an instance of matrix_multiplier
+        profiler: optional PhaseProfiler, times the model and comparison
+        record: transaction records of the monitors, see DataValidMonitor
+            ("ring" bounds the memory of long soak runs)
+        maxsize, overflow: bound and overflow policy of the monitor queues,
+            see DataValidMonitor. Unbounded by default; with a maxsize, the
+            default overflow="fail" makes a consumer maxsize transactions
+            behind the monitors a hard test failure (QueueFull), for long
+            runs in bounded memory.
+        expected_latency: arg_valid to sqrt_valid latency in clock cycles
+            checked for each transaction, "auto" for WIDTH/2 (the iterative
+            algorithm of square_root). Default None: the latencies are only
+            collected in the histogram
+        engine: sampling engine of the monitors, "edge" (EdgeDataValidMonitor)
+            or "shared" (SharedClockMonitor, one ClockSampler per clock)
+        clk: clock of the monitors (default: the clk port of the instance)
+        period: clock period of the monitors in simulator steps (default:
+            measured by the monitors)
+        check: "transaction" asserts each result as it arrives, "batch"
+            checks chunks of chunk_size results at once (numpy when
+            installed) and reports the first max_reported mismatches.
+            Default: "transaction", a mismatch fails where it happens.
+            In batch mode, the results of the last, incomplete chunk are
+            checked by stop(): a test with fewer than chunk_size results is
+            only checked there, at the end of the test.
+
+    The latency histogram of all transactions is in self.latency, and
+    logged by stop().
     """
 
     # instead of the dut (top level), here the constructor expects
     # the instance for the hdl module, as labeled in the VHDL file.
     # this will be done in the base class, and passed as an argument
     # to the constructor through inst_Sqrt.
-    def __init__(self, inst_Sqrt):
+    def __init__(
+        self,
+        inst_Sqrt,
+        profiler=None,
+        record="slots",
+        maxsize=0,
+        overflow="fail",
+        expected_latency=None,
+        check="transaction",
+        chunk_size=256,
+        max_reported=10,
+        engine="edge",
+        clk=None,
+        period=None,
+    ):
         self.inst_Sqrt = inst_Sqrt
+        self.profiler = profiler
         self.log = SimLog("cocotb.base.%s" % (type(self).__qualname__))
+        # per-transaction messages are sampled, and counts summarized
+        self._model_log = SampledLog(self.log)
+        self.summary = SummaryLog(self.log, "MMC_sqrt")
+
+        if engine not in ("edge", "shared"):
+            raise ValueError(f"engine={engine!r}: expected edge or shared")
+        # low-callback monitors: the square_root ports are registered
+        Monitor = EdgeDataValidMonitor if engine == "edge" else SharedClockMonitor
+        clk = self.inst_Sqrt.clk if clk is None else clk
 
-        self.input_mon = DataValidMonitor(
-            clk=self.inst_Sqrt.clk,
+        self.input_mon = Monitor(
+            clk=clk,
 # change the "fill with" parts below
             valid=self.inst_Sqrt.arg_valid,
             datas=dict(Argument=self.inst_Sqrt.arg),
+            record=record,
+            maxsize=maxsize,
+            overflow=overflow,
+            timestamps=True,
+            period=period,
         )
 
-        self.output_mon = DataValidMonitor(
-            clk=self.inst_Sqrt.clk, 
+        self.output_mon = Monitor(
+            clk=clk, 
 # change the "fill with" parts below
             valid=self.inst_Sqrt.sqrt_valid, 
-            datas=dict(SqrtResult=self.inst_Sqrt.sqrt_res)
+            datas=dict(SqrtResult=self.inst_Sqrt.sqrt_res),
+            record=record,
+            maxsize=maxsize,
+            overflow=overflow,
+            timestamps=True,
+            period=period,
         )
 
+        # golden model sized from the instance: WIDTH generic of square_root
+        self.width = len(self.inst_Sqrt.arg)
+        self._table = isqrt_table(self.width) if self.width <= MAX_TABLE_WIDTH else None
+
+        # one sqrt_res bit per iteration, one iteration per clock cycle
+        self.expected_latency = self.width // 2 if expected_latency == "auto" else expected_latency
+        self.latency = LatencyHistogram()
+
+        if check not in ("transaction", "batch"):
+            raise ValueError(f"check={check!r}: expected transaction or batch")
+        if check == "batch" and maxsize and chunk_size >= maxsize:
+            raise ValueError(f"chunk_size {chunk_size} must be below maxsize {maxsize}")
+        self.check = check
+        self.chunk_size = chunk_size
+        self.max_reported = max_reported
+        # results sampled since the last chunk, and checked in total
+        self._pending = 0
+        self._checked = 0
+        self._chunk_ready = Event()
+        if check == "batch":
+            self.output_mon.callbacks.append(self._count_result)
+
         self._checker = None
 
     def start(self) -> None:
@@ -135,7 +647,10 @@ class MMC_sqrt:
             raise RuntimeError("Monitor already started")
         self.input_mon.start()
         self.output_mon.start()
-        self._checker = cocotb.start_soon(self._check())
+        if self.check == "batch":
+            self._checker = cocotb.start_soon(self._check_batches())
+        else:
+            self._checker = cocotb.start_soon(self._check())
 
     def stop(self) -> None:
         """Stops everything"""
@@ -145,24 +660,191 @@ class MMC_sqrt:
         self.output_mon.stop()
         self._checker.kill()
         self._checker = None
+        if self.check == "batch":
+            # results of the last, incomplete chunk
+            with break_on_failure():
+                self._check_chunk()
+        self.summary.flush()
+        for name, monitor in (("input", self.input_mon), ("output", self.output_mon)):
+            self.log.info(
+                "%s monitor queue: high water %d, dropped %d",
+                name, monitor.high_water, monitor.dropped,
+            )
+        self.log.info("latency in clock cycles: %s", self.latency.summary())
 
     def model(self, model_input_value: int) -> int:
         # to fill. Calculate the integer square root from the
         # model_input_value. You can use the library of your
         # choice (math module, numpy, etc)
         # Make sure the final value is an integer
-        Expected = math.sqrt(model_input_value)
-        Expected = math.floor(Expected)
-        
-        self.log.info("Model predicts: " + str(Expected))
+        if self._table is not None:
+            Expected = int(self._table[int(model_input_value)])
+        else:
+            Expected = cached_isqrt(int(model_input_value))
+
+        # formatted only when debug messages are enabled
+        self._model_log.debug("Model predicts: %d", Expected)
         return Expected
 
+    def model_batch(self, model_input_values):
+        """
+        Return the expected results of a sequence of arguments.
+
+        With numpy and a tabulated width, this is a single table lookup
+        returning an array; otherwise a list.
+        """
+        if self._table is None:
+            return [cached_isqrt(int(value)) for value in model_input_values]
+        if np is not None:
+            return self._table[np.asarray(model_input_values, dtype=np.int64)]
+        return [self._table[int(value)] for value in model_input_values]
+
     async def _check(self) -> None:
-        while True:
-            actual = await self.output_mon.values.get()
-            expected_inputs = await self.input_mon.values.get()
-            expected = self.model(
-                model_input_value=expected_inputs["Argument"]
+        # with DEBUGPY=failure, a mismatch breaks into the debugger
+        with break_on_failure():
+            while True:
+                actual = await self.output_mon.values.get()
+                expected_inputs = await self.input_mon.values.get()
+                if self.profiler is None:
+                    self._compare(actual, expected_inputs)
+                else:
+                    # pure Python time: no simulated time passes here
+                    with self.profiler.call("MMC_sqrt.check"):
+                        self._compare(actual, expected_inputs)
+
+    def _compare(self, actual, expected_inputs) -> None:
+        # same rules as the offline replay, see common/sqrt_check.py
+        argument = expected_inputs["Argument"]
+        expected = None if argument is None else self.model(model_input_value=argument)
+        cycles = latency_cycles(expected_inputs["time"], actual["time"], self.input_mon.period)
+        self.latency.add(cycles)
+        failure = check_transaction(
+            argument, actual["SqrtResult"], expected, cycles, self.expected_latency
+        )
+        assert failure is None, failure
+        self.summary.count("checked")
+
+    def _count_result(self, transaction) -> None:
+        # output monitor callback: wake the batch checker once per chunk
+        self._pending += 1
+        if self._pending >= self.chunk_size:
+            self._chunk_ready.set()
+
+    async def _check_batches(self) -> None:
+        # one coroutine switch per chunk of results, not per result
+        with break_on_failure():
+            while True:
+                await self._chunk_ready.wait()
+                self._chunk_ready.clear()
+                if self.profiler is None:
+                    self._check_chunk()
+                else:
+                    with self.profiler.call("MMC_sqrt.check_chunk"):
+                        self._check_chunk()
+
+    def _check_chunk(self) -> None:
+        """Check all the queued results that have their argument queued."""
+        self._pending = 0
+        count = min(self.output_mon.values.qsize(), self.input_mon.values.qsize())
+        if not count:
+            return
+        outputs = [self.output_mon.values.get_nowait() for _ in range(count)]
+        inputs = [self.input_mon.values.get_nowait() for _ in range(count)]
+        arguments = [transaction["Argument"] for transaction in inputs]
+        results = [transaction["SqrtResult"] for transaction in outputs]
+        # arguments with X/Z bits have no model value: they are failures
+        unknown = [i for i, argument in enumerate(arguments) if argument is None]
+        expected = self.model_batch(
+            [0 if argument is None else argument for argument in arguments]
+        )
+
+        period = self.input_mon.period
+        cycles = [
+            latency_cycles(argument["time"], output["time"], period)
+            for output, argument in zip(outputs, inputs)
+        ]
+        self.latency.counts.update(cycles)
+
+        if np is not None:
+            # float64: exact for the results, and X/Z results (None) become NaN
+            failed = np.flatnonzero(np.array(results, dtype=np.float64) != expected).tolist()
+        else:
+            failed = [i for i, (r, e) in enumerate(zip(results, expected)) if r != e]
+        if self.expected_latency is not None:
+            late = [i for i, c in enumerate(cycles) if c != self.expected_latency]
+            failed = sorted(set(failed).union(late))
+        if unknown:
+            failed = sorted(set(failed).union(unknown))
+
+        first = self._checked
+        self._checked += count
+        self.summary.count("checked", count)
+        if not failed:
+            return
+        for i in failed[: self.max_reported]:
+            self.log.error(
+                "transaction %d: %s",
+                first + i,
+                check_transaction(
+                    arguments[i], results[i], expected[i], cycles[i], self.expected_latency
+                ),
             )
-            assert actual["SqrtResult"] == expected
+        assert not failed, "%d of %d transactions failed (transactions %d to %d)" % (
+            len(failed), count, first, first + count - 1
+        )
+
+
+
+# ports identifying a square_root instance, when the simulator does not
+# report the entity name of the instances
+SQRT_PORTS = ("clk", "arg", "arg_valid", "sqrt_res", "sqrt_valid")
+
+
+def find_instances(root: SimHandleBase, entity="square_root", ports=SQRT_PORTS):
+    """
+    Return the instances of an entity below root, in hierarchy order.
 
+    An instance matches by its definition name, or by having all the
+    given ports. The hierarchy is walked once, signals are not visited.
+    """
+    found = []
+    for child in root:
+        if not isinstance(child, RegionObject):
+            continue
+        definition = (child._def_name or "").lower()
+        if definition == entity or (
+            not definition and all(hasattr(child, port) for port in ports)
+        ):
+            found.append(child)
+        else:
+            found += find_instances(child, entity, ports)
+    return found
+
+
+def attach_sqrt_checkers(root: SimHandleBase, clk=None, engine=None, **options):
+    """
+    Return one MMC_sqrt checker per square_root instance below root.
+
+    Args
+        root: toplevel (or any scope) to search
+        clk: common clock of the instances. When given and several
+             instances are found, all their monitors share a single
+             ClockSampler on it instead of two coroutines per instance.
+        engine: "edge" or "shared" (needs clk) to force the sampling engine
+             of the monitors. The Lab06 toplevel has a single instance, so
+             the shared engine only runs when forced.
+        options: other MMC_sqrt arguments (profiler, check...)
+
+    Raises LookupError when no instance is found: the entity name relies
+    on the private _def_name of the handles, the port names are the
+    fallback when the simulator does not report it.
+    """
+    instances = find_instances(root)
+    if not instances:
+        raise LookupError(f"no square_root instance found below {root._path}")
+    if engine is None:
+        engine = "shared" if clk is not None and len(instances) > 1 else "edge"
+    return [
+        MMC_sqrt(instance, engine=engine, clk=clk if engine == "shared" else None, **options)
+        for instance in instances
+    ]
@@ -0,0 +1,278 @@
+# This file is public domain, it can be freely copied without restrictions.
+# SPDX-License-Identifier: CC0-1.0
+"""
+Benchmark suite of the lab toplevels.
+
+Runs a fixed, seeded workload on each toplevel (adder, square_root,
+rt2024mysystemtop) through the lab runners, and reports for each one:
+
+    sim ns/s     simulated nanoseconds per wall-clock second of the tests
+    txn/s        transactions per wall-clock second of the tests
+    peak RSS     maximum resident memory of the simulator process
+
+The test times come from the cocotb results file, so the simulator start-up
+and the build are not measured. Every workload runs in a fresh process, so
+the peak RSS of one run does not hide the next one. The environment
+variables selecting the transport, timing profile, waveforms, recording
+and debugging of the tests are pinned (BENCHMARK_ENV), so the workload does
+not depend on the caller's environment.
+
+    python common/benchmark.py                          # run, write benchmark.json
+    python common/benchmark.py --save-baseline          # also make it the baseline
+    python common/benchmark.py --baseline base.json     # compare, exit 1 on slowdown
+
+Outputs go to regression_build/benchmark/ (see --output).
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import NamedTuple, Union
+
+from regression import REPO_ROOT, build_all, discover_jobs, run_job
+
+# fixed seed of all workloads, for repeatable stimulus
+BENCHMARK_SEED = 20240601
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "benchmark_baseline.json"
+
+# fractional slowdown accepted before reporting a regression
+DEFAULT_TOLERANCE = 0.15
+
+# environment of all workloads, None unsets the variable
+BENCHMARK_ENV = {
+    "RT2024_TRANSPORT": "uart",
+    "RT2024_TIMING": "realistic",
+    "WAVES": None,
+    "RT2024_RECORD_DIR": None,
+    "DEBUGPY": None,
+}
+
+
+class Workload(NamedTuple):
+    """One seeded cocotb test run of a lab toplevel"""
+
+    name: str
+    lab: str
+    module: str
+    testcase: str
+    # transactions of one run of the testcase, or the name of its test class
+    # in the module, whose Transactions attribute is that count
+    transactions: Union[int, str]
+
+
+WORKLOADS = (
+    Workload("adder", "Lab01", "test_adder_solution", "adder_randomised_test", 10),
+    Workload("square_root", "Lab02", "lab02_cocotb_solution", "sqrt_test", 1),
+    Workload(
+        "rt2024mysystemtop",
+        "Lab06",
+        "Lab06_MainEnvironment_solution_fixCrossover",
+        "RandomTest",
+        "RandomTestClass",
+    ),
+)
+
+
+def _run_workload(job, output_dir, options):
+    """Run one workload in the calling (fresh) process, return its result and peak RSS."""
+    result = run_job(job, output_dir, options)
+    # the simulator is a child process of this one, and has exited
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return result, peak_rss_kb
+
+
+def pin_environment() -> None:
+    """Apply BENCHMARK_ENV to this process, and so to the workload processes."""
+    for name, value in BENCHMARK_ENV.items():
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = value
+
+
+def workload_transactions(workload, job) -> int:
+    """Return the transactions of one run of a workload, its module being imported."""
+    if isinstance(workload.transactions, int):
+        return workload.transactions
+    # the module was imported by build_all(), through its runner
+    return getattr(sys.modules[job.name], workload.transactions).Transactions
+
+
+def measure(workload, result, peak_rss_kb):
+    """Return the metrics of one workload run, from its results file."""
+    metrics = dict(workload._asdict(), seed=BENCHMARK_SEED, peak_rss_kb=peak_rss_kb)
+    if result.error or result.results_xml is None or not Path(result.results_xml).is_file():
+        metrics["error"] = result.error or "no results file"
+        return metrics
+
+    testcases = list(ET.parse(result.results_xml).getroot().iter("testcase"))
+    sim_ns = sum(float(testcase.get("sim_time_ns", 0)) for testcase in testcases)
+    wall_s = sum(float(testcase.get("time", 0)) for testcase in testcases)
+    failed = sum(testcase.find("failure") is not None for testcase in testcases)
+    metrics.update(
+        sim_ns=sim_ns,
+        wall_s=wall_s,
+        process_wall_s=result.wall_time_s,
+        sim_ns_per_s=sim_ns / max(wall_s, 1e-9),
+        transactions_per_s=workload.transactions / max(wall_s, 1e-9),
+    )
+    if failed or not testcases:
+        metrics["error"] = f"{failed} failed testcase(s), see {result.log_file}"
+    return metrics
+
+
+def run_benchmarks(workloads, output_dir: Path, repeat=1):
+    """
+    Build, then run every workload `repeat` times, each in a fresh process.
+
+    Returns the metrics of the fastest run of each workload.
+    """
+    jobs = {}
+    for job in discover_jobs(sorted({workload.lab for workload in workloads})):
+        jobs[job.name] = job
+    selected = [jobs[workload.module] for workload in workloads]
+    output_dir.mkdir(parents=True, exist_ok=True)
+    pin_environment()
+    build_all(list(dict.fromkeys(selected)), output_dir)
+
+    benchmarks = []
+    # a new spawned process per run, for a per-run peak RSS (one pool per run:
+    # max_tasks_per_child needs Python 3.11)
+    context = multiprocessing.get_context("spawn")
+    for workload, job in zip(workloads, selected):
+        workload = workload._replace(transactions=workload_transactions(workload, job))
+        runs = []
+        for index in range(repeat):
+            options = dict(
+                testcase=workload.testcase,
+                seed=BENCHMARK_SEED,
+                results_xml=f"{workload.name}.bench{index}.results.xml",
+            )
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result, peak_rss_kb = pool.submit(
+                    _run_workload, job, output_dir, options
+                ).result()
+            runs.append(measure(workload, result, peak_rss_kb))
+        best = min(runs, key=lambda run: run.get("wall_s", float("inf")))
+        # memory does not depend on the host load: keep the worst run
+        best["peak_rss_kb"] = max(run["peak_rss_kb"] for run in runs)
+        benchmarks.append(best)
+        print(format_line(best))
+    return benchmarks
+
+
+def format_line(metrics) -> str:
+    if "error" in metrics:
+        return f"{metrics['name']:<20} ERROR {metrics['error']}"
+    return (
+        f"{metrics['name']:<20} {metrics['sim_ns_per_s']:>14.0f} "
+        f"{metrics['transactions_per_s']:>10.1f} {metrics['peak_rss_kb'] / 1024:>10.1f}"
+    )
+
+
+def compare(benchmarks, baseline, tolerance):
+    """
+    Return the regressions of benchmarks against baseline, as messages.
+
+    Throughputs may drop and the peak RSS may grow by `tolerance` (fraction).
+    """
+    reference = {metrics["name"]: metrics for metrics in baseline["benchmarks"]}
+    regressions = []
+    for metrics in benchmarks:
+        base = reference.get(metrics["name"])
+        if base is None or "error" in base:
+            continue
+        if "error" in metrics:
+            regressions.append(f"{metrics['name']}: {metrics['error']}")
+            continue
+        for key in ("sim_ns_per_s", "transactions_per_s"):
+            if metrics[key] < base[key] * (1 - tolerance):
+                regressions.append(
+                    f"{metrics['name']}: {key} {metrics[key]:.1f} < baseline {base[key]:.1f}"
+                )
+        if metrics["peak_rss_kb"] > base["peak_rss_kb"] * (1 + tolerance):
+            regressions.append(
+                f"{metrics['name']}: peak_rss_kb {metrics['peak_rss_kb']} "
+                f"> baseline {base['peak_rss_kb']}"
+            )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "workloads",
+        nargs="*",
+        help=f"workloads to run (default: all of {', '.join(w.name for w in WORKLOADS)})",
+    )
+    parser.add_argument(
+        "-o", "--output", default="regression_build/benchmark", help="output directory"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="runs per workload, the fastest is kept"
+    )
+    parser.add_argument(
+        "--baseline",
+        default=str(DEFAULT_BASELINE),
+        help="baseline results to compare with (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="write the results as the baseline"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="accepted fractional slowdown (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+
+    workloads = [w for w in WORKLOADS if not args.workloads or w.name in args.workloads]
+    if not workloads:
+        parser.error("no workload selected")
+    output_dir = Path(args.output).resolve()
+
+    print(f"{'workload':<20} {'sim ns/s':>14} {'txn/s':>10} {'RSS (MB)':>10}")
+    benchmarks = run_benchmarks(workloads, output_dir, args.repeat)
+
+    import cocotb
+
+    results = {
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "cocotb": cocotb.__version__,
+        "repo": str(REPO_ROOT),
+        "benchmarks": benchmarks,
+    }
+    results_file = output_dir / "benchmark.json"
+    results_file.write_text(json.dumps(results, indent=2))
+    print(f"results: {results_file}")
+
+    baseline_file = Path(args.baseline)
+    if args.save_baseline:
+        baseline_file.write_text(json.dumps(results, indent=2))
+        print(f"baseline saved: {baseline_file}")
+        return 0
+    if not baseline_file.is_file():
+        print(f"no baseline {baseline_file}, use --save-baseline to create it")
+        return 0
+
+    regressions = compare(benchmarks, json.loads(baseline_file.read_text()), args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    errors = [metrics for metrics in benchmarks if "error" in metrics]
+    return 1 if regressions or errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+# This file is public domain, it can be freely copied without restrictions.
+# SPDX-License-Identifier: CC0-1.0
+"""
+Content-hash keyed build cache for the cocotb runners of the RT2024 labs.
+
+The lab runners used to call ``runner.build(..., always=True)``, so GHDL
+re-analyzed and re-elaborated every VHDL file on each invocation.
+``cached_build`` hashes everything that influences the build (source file
+contents, toplevel, generics, simulator flags, the ``--version`` output of
+the simulator and the cocotb version) and only calls ``runner.build`` when
+that hash differs from the one stored in the build directory by the last
+successful build.
+
+Usage, from a lab runner:
+
+    sys.path.append(str(proj_path.parent / "common"))
+    from build_cache import cached_build
+
+    runner = get_runner("ghdl")
+    cached_build(runner, vhdl_sources=vhdl_sources, hdl_toplevel="square_root")
+    runner.test(hdl_toplevel="square_root", hdl_toplevel_lang="vhdl", test_module=...)
+
+Set the environment variable ``RT2024_ALWAYS_BUILD=1`` to force a rebuild.
+"""
+
+import functools
+import hashlib
+import logging
+import os
+import subprocess
+from pathlib import Path
+
+import cocotb
+
+# stamp written in the build directory after a successful build
+STAMP_NAME = ".rt2024_build_hash"
+
+# version command of the simulators, by runner class: an upgraded simulator
+# must not reuse the libraries compiled by the previous one
+VERSION_COMMANDS = {
+    "Ghdl": ["ghdl", "--version"],
+    "Icarus": ["iverilog", "-V"],
+    "Verilator": ["verilator", "--version"],
+}
+
+log = logging.getLogger(__name__)
+
+
+def _hash_value(hasher, value) -> None:
+    """Feed a build argument to the hasher, independently of dict ordering."""
+    if isinstance(value, dict):
+        value = sorted((str(k), str(v)) for k, v in value.items())
+    hasher.update(repr(value).encode())
+
+
+@functools.lru_cache(maxsize=None)
+def simulator_version(simulator) -> str:
+    """Return the version output of a runner class name, "" if unknown."""
+    command = VERSION_COMMANDS.get(simulator)
+    if command is None:
+        return ""
+    try:
+        return subprocess.run(
+            command, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def build_hash(runner, **build_kwargs) -> str:
+    """
+    Return the hash identifying a build.
+
+    Args
+        runner: cocotb runner object, as returned by get_runner()
+        build_kwargs: keyword arguments that will be passed to runner.build()
+
+    Source files (any ``*_sources`` argument) are hashed by content, so touching
+    a file without editing it, or using an identical copy of it from another
+    lab directory, does not invalidate the build.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(type(runner).__qualname__.encode())
+    hasher.update(simulator_version(type(runner).__qualname__).encode())
+    hasher.update(cocotb.__version__.encode())
+
+    for name in sorted(build_kwargs):
+        value = build_kwargs[name]
+        hasher.update(name.encode())
+        if name.endswith("_sources"):
+            for source in value:
+                # keep the file order, it matters for the analysis order
+                hasher.update(Path(source).name.encode())
+                hasher.update(hashlib.sha256(Path(source).read_bytes()).digest())
+        else:
+            _hash_value(hasher, value)
+
+    return hasher.hexdigest()
+
+
+def cached_build(runner, build_dir="sim_build", always=False, **build_kwargs) -> bool:
+    """
+    Run ``runner.build`` only if the build inputs changed since the last build.
+
+    Args
+        runner: cocotb runner object, as returned by get_runner()
+        build_dir: directory of the build, same meaning as in runner.build()
+        always: force the build step, as the "always" argument of runner.build()
+        build_kwargs: any other runner.build() argument (vhdl_sources, hdl_toplevel,
+                      parameters, build_args, ...)
+
+    Returns True if the build step was run, False if the cached build was reused.
+
+    When the build step is skipped, the runner never sees the source lists, so
+    pass hdl_toplevel_lang to runner.test() explicitly.
+    """
+    always = always or os.getenv("RT2024_ALWAYS_BUILD", "0") not in ("", "0")
+    key = build_hash(runner, **build_kwargs)
+    stamp = Path(build_dir).resolve() / STAMP_NAME
+
+    if not always and stamp.is_file() and stamp.read_text().strip() == key:
+        log.info("Build in %s is up to date, skipping build step", stamp.parent)
+        return False
+
+    # remove the stamp first, an interrupted build must not be reused
+    if stamp.is_file():
+        stamp.unlink()
+
+    runner.build(build_dir=build_dir, always=True, **build_kwargs)
+    stamp.write_text(key + "\n")
+    return True
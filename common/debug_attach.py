@@ -0,0 +1,102 @@
+# This file is public domain, it can be freely copied without restrictions.
+# SPDX-License-Identifier: CC0-1.0
+"""
+On-demand debugpy attach for the cocotb tests.
+
+debugpy is only imported when a debug session is requested, so regular and
+regression runs pay neither the import nor any run-time cost. The request is
+an environment variable, or a plusarg added to the simulator command line:
+
+    DEBUGPY=start       attach_debugger() waits for the client, then breaks
+    DEBUGPY=failure     the first assertion failure inside break_on_failure()
+                        waits for the client, then breaks in its __exit__,
+                        where failing_frame is the frame of the failed
+                        assert (innermost frame of the traceback)
+    DEBUGPY_PORT=5678   port to listen on (default 5678)
+    +debugpy=start      same as DEBUGPY, as a plusarg
+
+Attach with the "Python Debugger: Remote Attach" configuration of
+Lab03/solution/launch.json.
+"""
+
+import os
+
+DEFAULT_PORT = 5678
+
+_mode = None
+_listening = False
+
+
+def debug_mode() -> str:
+    """Return the requested debug mode: "", "start" or "failure"."""
+    global _mode
+    if _mode is None:
+        mode = os.getenv("DEBUGPY", "")
+        if not mode:
+            import cocotb
+
+            mode = (cocotb.plusargs or {}).get("debugpy", "")
+            # a bare +debugpy plusarg means "start"
+            if mode is True:
+                mode = "start"
+        _mode = str(mode).strip().lower()
+        if _mode not in ("", "0", "start", "failure"):
+            raise ValueError(f"DEBUGPY={_mode!r}: expected start or failure")
+        if _mode == "0":
+            _mode = ""
+    return _mode
+
+
+def _wait_for_client():
+    global _listening
+    import debugpy
+
+    if not _listening:
+        import cocotb
+
+        port = int(os.getenv("DEBUGPY_PORT", DEFAULT_PORT))
+        debugpy.listen(port)
+        _listening = True
+        cocotb.log.info("debugpy: waiting for a client on port %d", port)
+    debugpy.wait_for_client()
+    return debugpy
+
+
+def attach_debugger() -> None:
+    """With DEBUGPY=start, wait for the debugger client and break here."""
+    if debug_mode() == "start":
+        debugpy = _wait_for_client()
+        debugpy.breakpoint()
+
+
+class break_on_failure:
+    """
+    Context manager breaking into the debugger on an AssertionError (DEBUGPY=failure).
+
+    Wrap a whole checking loop, not each transaction: entering and leaving
+    the block is the only cost, and nothing happens without DEBUGPY=failure.
+    The exception is re-raised after the debug session, so the test still fails.
+    """
+
+    _triggered = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if (
+            exc_type is not None
+            and issubclass(exc_type, AssertionError)
+            and not break_on_failure._triggered
+            and debug_mode() == "failure"
+        ):
+            # only the first failure of the simulation stops
+            break_on_failure._triggered = True
+            debugpy = _wait_for_client()
+            # the assert may be nested in calls made from the with block:
+            # the failed frame is the innermost one of the traceback
+            while traceback.tb_next is not None:
+                traceback = traceback.tb_next
+            failing_frame = traceback.tb_frame  # noqa: F841, inspect its f_locals
+            debugpy.breakpoint()
+        return False
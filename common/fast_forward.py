@@ -0,0 +1,43 @@
+# This file is public domain, it can be freely copied without restrictions.
+# SPDX-License-Identifier: CC0-1.0
+"""
+Fast-forward wait for long idle periods of the tests.
+
+ClockCycles(clk, n) wakes Python on each of the n clock edges. When nothing
+happens meanwhile (reset, drain at the end of a test), the same wait can be
+one timer and a realignment on the clock:
+
+    await fast_forward_cycles(dut.clk, 10000, period_ns=100)
+
+returns on the same rising edge as ClockCycles(dut.clk, 10000, rising=True).
+The waiting coroutine is resumed 3 times instead of 10000, which saves the
+trigger bookkeeping and context switches of the wait itself, not the cost
+of the clock: a cocotb 1.8 Clock is a Python coroutine too, still woken
+twice per cycle, so the wait is at best about a third cheaper. The clock
+must be free-running with this period during the wait; other coroutines
+keep running as usual.
+"""
+
+from cocotb.triggers import ClockCycles, RisingEdge, Timer
+
+# below this count, ClockCycles is as cheap
+MIN_FAST_FORWARD_CYCLES = 4
+
+
+async def fast_forward_cycles(clk, cycles, period_ns):
+    """
+    Wait for the cycles-th rising edge of clk, like ClockCycles(clk, cycles).
+
+    Args
+        clk: clock signal, running with period_ns
+        cycles: number of rising edges to wait for
+        period_ns: clock period in ns
+    """
+    if cycles < MIN_FAST_FORWARD_CYCLES:
+        await ClockCycles(clk, cycles, rising=True)
+        return
+    # first edge: aligned on the clock, wherever the wait started
+    await RisingEdge(clk)
+    # half a period before the last edge, then the last edge itself
+    await Timer((cycles - 1.5) * period_ns, "ns")
+    await RisingEdge(clk)
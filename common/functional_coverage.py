@@ -0,0 +1,251 @@
+# This file is public domain, it can be freely copied without restrictions.
+# SPDX-License-Identifier: CC0-1.0
+"""
+Functional coverage of monitored values, stored in compact bitmaps.
+
+A CoverPoint has one bin per value of a width-bit field, kept as one bit
+of a bitmap, and optional named ranges, kept as hit counters. Cover points
+are fed by the transactions of the DataValidMonitor instances:
+
+    coverage = CoverageCollector("Lab06_Environment_solution.RandomTestClass")
+    arguments = coverage.add_point("argument", width=8, ranges=even_ranges(8, 4))
+    coverage.hook(checker.input_mon, "Argument", arguments)
+    ...
+    coverage.write()        # <name>.<seed>.coverage.json
+
+Databases merge with a bitwise or of the bitmaps and a sum of the counters,
+so the runs of a parallel regression combine cheaply:
+
+    python common/functional_coverage.py merge merged.json regression_build/workers/*/*/*.coverage.json
+    python common/functional_coverage.py report merged.json
+
+Coverage-driven stimulus draws the values not covered yet, and stops at
+the coverage target:
+
+    for value in closure_stimulus(arguments, target=100.0):
+        await self.SendValue(value)
+
+The databases are written in the simulator working directory, or in
+RT2024_COVERAGE_DIR when set.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from bisect import bisect_right
+from pathlib import Path
+
+COVERAGE_SUFFIX = ".coverage.json"
+
+
+def even_ranges(width, count):
+    """Split the values of a width-bit field in count equal (name, low, high) ranges."""
+    size = 2**width // count
+    return [
+        (f"{low}..{low + size - 1}", low, low + size - 1)
+        for low in range(0, size * count, size)
+    ]
+
+
+class CoverPoint:
+    """
+    Coverage of one field: a bit per value, a hit counter per range
+
+    Args
+        name: name of the cover point
+        width: width of the field in bits, 2**width value bins
+        ranges: list of (name, low, high) inclusive ranges, non overlapping
+    """
+
+    def __init__(self, name, width, ranges=()):
+        self.name = name
+        self.width = width
+        self.bitmap = bytearray((2**width + 7) // 8)
+        self.ranges = sorted(ranges, key=lambda r: r[1])
+        self.range_hits = [0] * len(self.ranges)
+        self._range_lows = [low for _, low, _ in self.ranges]
+        self.samples = 0
+        # samples with X/Z bits (None values)
+        self.unknown = 0
+        # number of bitmap bits set
+        self._covered = 0
+
+    def sample(self, value) -> None:
+        self.samples += 1
+        if value is None:
+            self.unknown += 1
+            return
+        value = int(value)
+        byte, bit = value >> 3, 1 << (value & 7)
+        if not self.bitmap[byte] & bit:
+            self.bitmap[byte] |= bit
+            self._covered += 1
+        if self.ranges:
+            index = bisect_right(self._range_lows, value) - 1
+            if index >= 0 and value <= self.ranges[index][2]:
+                self.range_hits[index] += 1
+
+    def covered(self, value) -> bool:
+        return bool(self.bitmap[value >> 3] & (1 << (value & 7)))
+
+    def covered_count(self) -> int:
+        return self._covered
+
+    def _count_covered(self) -> None:
+        self._covered = sum(bin(byte).count("1") for byte in self.bitmap)
+
+    def uncovered(self):
+        """Return the values never sampled, in increasing order."""
+        return [value for value in range(2**self.width) if not self.covered(value)]
+
+    def percent(self) -> float:
+        return 100 * self.covered_count() / 2**self.width
+
+    def as_dict(self):
+        return {
+            "width": self.width,
+            "samples": self.samples,
+            "unknown": self.unknown,
+            "bitmap": self.bitmap.hex(),
+            "ranges": [
+                [name, low, high, hits]
+                for (name, low, high), hits in zip(self.ranges, self.range_hits)
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, name, data) -> "CoverPoint":
+        point = cls(name, data["width"], [tuple(r[:3]) for r in data["ranges"]])
+        point.bitmap[:] = bytes.fromhex(data["bitmap"])
+        point.range_hits = [r[3] for r in data["ranges"]]
+        point.samples = data["samples"]
+        point.unknown = data["unknown"]
+        point._count_covered()
+        return point
+
+    def merge(self, other: "CoverPoint") -> None:
+        """Add the coverage of another run of the same cover point."""
+        if other.width != self.width or other.ranges != self.ranges:
+            raise ValueError(f"cover point {self.name}: different bins, cannot merge")
+        merged = int.from_bytes(self.bitmap, "little") | int.from_bytes(other.bitmap, "little")
+        self.bitmap[:] = merged.to_bytes(len(self.bitmap), "little")
+        self.range_hits = [a + b for a, b in zip(self.range_hits, other.range_hits)]
+        self.samples += other.samples
+        self.unknown += other.unknown
+        self._count_covered()
+
+    def summary(self) -> str:
+        text = f"{self.name}: {self.covered_count()}/{2**self.width} values ({self.percent():.1f}%)"
+        empty = [name for (name, _, _), hits in zip(self.ranges, self.range_hits) if not hits]
+        if empty:
+            text += f", empty ranges: {', '.join(empty)}"
+        return text
+
+
+def closure_stimulus(point: CoverPoint, target=100.0, rng=None):
+    """
+    Yield the values of a cover point not covered yet, in random order.
+
+    Args
+        point: cover point to close, sampled while the values are used
+        target: coverage percentage at which the generator stops
+        rng: random.Random instance (default: the random module, seeded
+             by cocotb with RANDOM_SEED)
+
+    The uncovered values are shuffled once; a value covered meanwhile (by
+    another stimulus, or a repeated result) is skipped. Closure then needs
+    one transaction per uncovered value, instead of the n*ln(n) random
+    draws of the coupon collector.
+    """
+    rng = rng or random
+    pending = point.uncovered()
+    rng.shuffle(pending)
+    for value in pending:
+        if point.percent() >= target:
+            return
+        if not point.covered(value):
+            yield value
+
+
+class CoverageCollector:
+    """
+    Named set of cover points, fed by monitor callbacks
+
+    Args
+        name: name of the run (test), also the database file name
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.points = {}
+
+    def add_point(self, name, width, ranges=()) -> CoverPoint:
+        """Return the cover point name, created on first use."""
+        if name not in self.points:
+            self.points[name] = CoverPoint(name, width, ranges)
+        return self.points[name]
+
+    def hook(self, monitor, field, point: CoverPoint) -> None:
+        """Sample field of each transaction of a DataValidMonitor in point."""
+        sample = point.sample
+        monitor.callbacks.append(lambda transaction: sample(transaction[field]))
+
+    def report(self, log) -> None:
+        for point in self.points.values():
+            log.info("coverage %s", point.summary())
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "points": {name: point.as_dict() for name, point in self.points.items()},
+        }
+
+    def write(self, directory=None) -> Path:
+        """Write the database, named after the run and its seed, and return its path."""
+        import cocotb
+
+        if directory is None:
+            directory = os.getenv("RT2024_COVERAGE_DIR", ".")
+        # seeded copies of a test may run in the same directory
+        path = Path(directory) / f"{self.name}.{cocotb.RANDOM_SEED}{COVERAGE_SUFFIX}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.as_dict()))
+        return path
+
+
+def merge_databases(paths, name="merged"):
+    """Return the CoverageCollector merging the coverage databases in paths."""
+    merged = CoverageCollector(name)
+    for path in paths:
+        data = json.loads(Path(path).read_text())
+        for point_name, point_data in data["points"].items():
+            point = CoverPoint.from_dict(point_name, point_data)
+            if point_name in merged.points:
+                merged.points[point_name].merge(point)
+            else:
+                merged.points[point_name] = point
+    return merged
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Merge and report coverage databases.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    merge = commands.add_parser("merge", help="merge databases in one")
+    merge.add_argument("output", help="merged database")
+    merge.add_argument("databases", nargs="+", help="databases to merge")
+    report = commands.add_parser("report", help="print the coverage of databases")
+    report.add_argument("databases", nargs="+", help="databases, merged before reporting")
+    args = parser.parse_args(argv)
+
+    merged = merge_databases(args.databases)
+    if args.command == "merge":
+        Path(args.output).write_text(json.dumps(merged.as_dict()))
+    for point in merged.points.values():
+        print(point.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
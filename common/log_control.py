@@ -0,0 +1,149 @@
+# This file is public domain, it can be freely copied without restrictions.
+# SPDX-License-Identifier: CC0-1.0
+"""
+Logging controls for the verification components.
+
+Per-component levels, set from the environment of the runner (the cocotb
+test process inherits it, or pass it in runner.test(extra_env=...)):
+
+    RT2024_LOG_LEVELS="cocotb.base=WARNING,cocotb.base.MMC_sqrt=DEBUG"
+
+Each entry sets the level of a logger and, through the logging hierarchy,
+of all the loggers below it ("cocotb.base" covers every environment and
+checker, "cocotb.rt2024mysystemtop" the UART drivers).
+
+Per-transaction messages, once their level is enabled, can be sampled
+(1 in RT2024_LOG_EVERY) and replaced by periodic aggregate summaries
+(every RT2024_LOG_SUMMARY transactions):
+
+    self.log_sampled = SampledLog(self.log)
+    self.log_sampled.debug("sampled %s", transaction)   # formatted only if emitted
+
+    self.summary = SummaryLog(self.log, "checker")
+    self.summary.count("checked")                       # logs "checker: checked 1000"
+    self.summary.flush()                                # at the end of the test
+"""
+
+import logging
+import os
+
+# default sampling and summary periods, in messages and transactions
+DEFAULT_EVERY = 1
+DEFAULT_SUMMARY = 1000
+
+
+def parse_log_levels(spec):
+    """Parse "logger=LEVEL,logger=LEVEL" in a {logger name: level number} dict."""
+    levels = {}
+    for entry in spec.split(","):
+        if not entry.strip():
+            continue
+        name, separator, level = entry.partition("=")
+        if not separator:
+            raise ValueError(f"invalid log level {entry!r}, expected logger=LEVEL")
+        level = level.strip().upper()
+        number = int(level) if level.isdigit() else logging.getLevelName(level)
+        if not isinstance(number, int):
+            raise ValueError(f"invalid log level {level!r} for {name.strip()!r}")
+        levels[name.strip()] = number
+    return levels
+
+
+def apply_log_levels(spec=None) -> None:
+    """Set the logger levels of RT2024_LOG_LEVELS (or spec)."""
+    if spec is None:
+        spec = os.getenv("RT2024_LOG_LEVELS", "")
+    for name, level in parse_log_levels(spec).items():
+        logging.getLogger(name).setLevel(level)
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def _check_period(kind, every) -> None:
+    if every < 1:
+        raise ValueError(f"invalid {kind} period {every}, expected 1 or more")
+
+
+class SampledLog:
+    """
+    Emits 1 message in `every`, per level
+
+    Args
+        log: logger (or SimLog) of the component
+        every: sampling period (default: RT2024_LOG_EVERY, 1 = all messages)
+
+    A disabled level costs one isEnabledFor() call; the message of a
+    skipped call is never formatted.
+    """
+
+    def __init__(self, log, every=None):
+        self.log = log
+        self.every = every if every is not None else _env_int("RT2024_LOG_EVERY", DEFAULT_EVERY)
+        _check_period("sampling", self.every)
+        self._calls = {}
+
+    def _log(self, level, msg, args) -> None:
+        if not self.log.isEnabledFor(level):
+            return
+        calls = self._calls.get(level, 0)
+        self._calls[level] = calls + 1
+        if calls % self.every:
+            return
+        if self.every > 1:
+            msg = f"{msg} [1 of {self.every}]"
+        self.log.log(level, msg, *args)
+
+    def debug(self, msg, *args) -> None:
+        self._log(logging.DEBUG, msg, args)
+
+    def info(self, msg, *args) -> None:
+        self._log(logging.INFO, msg, args)
+
+    def warning(self, msg, *args) -> None:
+        self._log(logging.WARNING, msg, args)
+
+
+class SummaryLog:
+    """
+    Aggregated counters, logged every `every` transactions instead of one line each
+
+    Args
+        log: logger (or SimLog) of the component
+        name: prefix of the summary lines
+        every: transactions between two summaries (default: RT2024_LOG_SUMMARY)
+        level: level of the summary lines
+    """
+
+    def __init__(self, log, name, every=None, level=logging.INFO):
+        self.log = log
+        self.name = name
+        self.every = every if every is not None else _env_int("RT2024_LOG_SUMMARY", DEFAULT_SUMMARY)
+        _check_period("summary", self.every)
+        self.level = level
+        self.counters = {}
+        self._transactions = 0
+
+    def count(self, key, increment=1, transactions=None) -> None:
+        """
+        Add increment to a counter.
+
+        transactions is the number of transactions the increment covers
+        (default: increment), the summary period is counted in transactions.
+        """
+        self.counters[key] = self.counters.get(key, 0) + increment
+        self._transactions += increment if transactions is None else transactions
+        if self._transactions >= self.every:
+            self.flush()
+
+    def flush(self) -> None:
+        """Log the counters (totals since the start), if they changed since the last summary."""
+        if self._transactions and self.log.isEnabledFor(self.level):
+            self.log.log(
+                self.level,
+                "%s: %s",
+                self.name,
+                ", ".join(f"{key} {value}" for key, value in self.counters.items()),
+            )
+        self._transactions = 0
@@ -0,0 +1,152 @@
+# This file is public domain, it can be freely copied without restrictions.
+# SPDX-License-Identifier: CC0-1.0
+"""
+Simulated time vs wall-clock time profiler for the cocotb test environments.
+
+Each phase of a test (reset, test, post-test...) and each call of a driver
+method is timed twice: in simulated time, and in host wall-clock time. A
+phase with a lot of simulated time and little wall time is cheap waiting; a
+phase with little simulated time and a lot of wall time is Python overhead.
+
+    profiler = PhaseProfiler("Lab06_Environment_solution.RandomTestClass")
+    with profiler.phase("InitSignalsClockAndReset"):
+        await self.InitSignalsClockAndReset()
+    with profiler.call("SendValue"):
+        await self.SendValue(value)
+    profiler.report(self.log)   # summary table in the simulation log
+    profiler.write_json()       # <name>.<seed>.profile.json
+
+The JSON files are written in the simulator working directory (the build
+directory), or in RT2024_PROFILE_DIR when set.
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from cocotb.utils import get_sim_time
+
+
+class CallStats:
+    """Accumulated times of one kind of call"""
+
+    __slots__ = ("count", "sim_ns", "wall_s", "max_sim_ns", "max_wall_s")
+
+    def __init__(self):
+        self.count = 0
+        self.sim_ns = 0.0
+        self.wall_s = 0.0
+        self.max_sim_ns = 0.0
+        self.max_wall_s = 0.0
+
+    def add(self, sim_ns, wall_s) -> None:
+        self.count += 1
+        self.sim_ns += sim_ns
+        self.wall_s += wall_s
+        self.max_sim_ns = max(self.max_sim_ns, sim_ns)
+        self.max_wall_s = max(self.max_wall_s, wall_s)
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "sim_ns": self.sim_ns,
+            "wall_s": self.wall_s,
+            "mean_sim_ns": self.sim_ns / self.count if self.count else 0.0,
+            "mean_wall_s": self.wall_s / self.count if self.count else 0.0,
+            "max_sim_ns": self.max_sim_ns,
+            "max_wall_s": self.max_wall_s,
+        }
+
+
+class PhaseProfiler:
+    """
+    Records the simulated and wall-clock time of test phases and calls
+
+    Args
+        name: name of the profiled test, also the JSON file name
+    """
+
+    def __init__(self, name):
+        self.name = name
+        # (phase, sim_ns, wall_s), in execution order
+        self.phases = []
+        self.calls = {}
+        self._start_sim_ns = get_sim_time("ns")
+        self._start_wall_s = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        """Time one phase of the test."""
+        sim_ns, wall_s = get_sim_time("ns"), time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append(
+                (name, get_sim_time("ns") - sim_ns, time.perf_counter() - wall_s)
+            )
+
+    @contextmanager
+    def call(self, name):
+        """Time one call, accumulated with the other calls of the same name."""
+        sim_ns, wall_s = get_sim_time("ns"), time.perf_counter()
+        try:
+            yield
+        finally:
+            stats = self.calls.get(name)
+            if stats is None:
+                stats = self.calls[name] = CallStats()
+            stats.add(get_sim_time("ns") - sim_ns, time.perf_counter() - wall_s)
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "total": {
+                "sim_ns": get_sim_time("ns") - self._start_sim_ns,
+                "wall_s": time.perf_counter() - self._start_wall_s,
+            },
+            "phases": [
+                {"name": name, "sim_ns": sim_ns, "wall_s": wall_s}
+                for name, sim_ns, wall_s in self.phases
+            ],
+            "calls": {name: stats.as_dict() for name, stats in self.calls.items()},
+        }
+
+    def report(self, log) -> None:
+        """Log the summary table of the phases and calls."""
+        profile = self.as_dict()
+        total_wall_s = max(profile["total"]["wall_s"], 1e-9)
+        lines = [
+            f"profile of {self.name}",
+            f"{'phase':<28} {'sim (ns)':>14} {'wall (s)':>10} {'wall %':>7} {'sim ns/s':>12}",
+        ]
+        for phase in profile["phases"] + [dict(name="total", **profile["total"])]:
+            lines.append(
+                f"{phase['name']:<28} {phase['sim_ns']:>14.0f} {phase['wall_s']:>10.4f} "
+                f"{100 * phase['wall_s'] / total_wall_s:>6.1f}% "
+                f"{phase['sim_ns'] / max(phase['wall_s'], 1e-9):>12.0f}"
+            )
+        if profile["calls"]:
+            lines.append(
+                f"{'call':<28} {'count':>6} {'mean sim (ns)':>14} "
+                f"{'mean wall (s)':>14} {'max wall (s)':>13}"
+            )
+            for name, stats in profile["calls"].items():
+                lines.append(
+                    f"{name:<28} {stats['count']:>6} {stats['mean_sim_ns']:>14.0f} "
+                    f"{stats['mean_wall_s']:>14.6f} {stats['max_wall_s']:>13.6f}"
+                )
+        log.info("\n".join(lines))
+
+    def write_json(self, directory=None) -> Path:
+        """Write the profile in <directory>/<name>.<seed>.profile.json and return its path."""
+        import cocotb
+
+        if directory is None:
+            directory = os.getenv("RT2024_PROFILE_DIR", ".")
+        # seeded copies of a test may run in the same directory
+        path = Path(directory) / f"{self.name}.{cocotb.RANDOM_SEED}.profile.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.as_dict(), indent=2))
+        return path
@@ -0,0 +1,406 @@
+# This file is public domain, it can be freely copied without restrictions.
+# SPDX-License-Identifier: CC0-1.0
+"""
+Regression driver for the RT2024 labs.
+
+Discovers the runner functions (simulation_runner / adder_runner) of the lab
+solution modules, builds each lab toplevel once, then runs the test modules
+in a process pool. Each worker runs GHDL in its own copy of the lab build
+directory, so parallel simulations never share a work library. The xUnit
+results of every run are merged in a single report.
+
+    python common/regression.py                  # all labs, one worker per core
+    python common/regression.py -j 4 Lab05 Lab06 # selected labs, 4 workers
+    python common/regression.py --shard --seeds 8 Lab06
+
+With --shard, every cocotb test of a module runs in its own simulator process
+(cocotb TESTCASE filter), so a slow randomized test no longer holds up the
+other tests of its module. --seeds adds seeded copies of the randomized tests.
+
+Outputs go to regression_build/ (see --output): shared builds in build/,
+worker copies and simulation logs in workers/, merged results in results.xml.
+"""
+
+import argparse
+import ast
+import fnmatch
+import importlib.util
+import json
+import os
+import shutil
+import sys
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from build_cache import STAMP_NAME
+from functional_coverage import COVERAGE_SUFFIX, merge_databases
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# names of the runner functions found in the lab solution modules
+RUNNER_NAMES = ("simulation_runner", "adder_runner")
+
+
+class RegressionJob(NamedTuple):
+    """One runner/test-module pair of a lab"""
+
+    lab: str
+    module_path: Path
+    runner_name: str
+
+    @property
+    def name(self) -> str:
+        return self.module_path.stem
+
+
+class JobResult(NamedTuple):
+    job: RegressionJob
+    name: str
+    results_xml: Optional[Path]
+    log_file: Path
+    wall_time_s: float
+    error: Optional[str]
+
+
+def discover_jobs(labs=None):
+    """
+    Return the runner/test-module pairs of the lab solution directories.
+
+    Args
+        labs: names of the lab directories to keep (default: all)
+
+    The modules are parsed, not imported, so discovery has no side effects.
+    """
+    jobs = []
+    for module_path in sorted(REPO_ROOT.glob("Lab*/solution/*.py")):
+        lab = module_path.parent.parent.name
+        if labs and lab not in labs:
+            continue
+        tree = ast.parse(module_path.read_text(), filename=str(module_path))
+        for node in tree.body:
+            if isinstance(node, ast.FunctionDef) and node.name in RUNNER_NAMES:
+                jobs.append(RegressionJob(lab, module_path, node.name))
+    return jobs
+
+
+def discover_tests(module_path: Path):
+    """Return the names of the @cocotb.test() functions of a module, in order."""
+    tree = ast.parse(module_path.read_text(), filename=str(module_path))
+    tests = []
+    for node in tree.body:
+        if not isinstance(node, (ast.AsyncFunctionDef, ast.FunctionDef)):
+            continue
+        for decorator in node.decorator_list:
+            if isinstance(decorator, ast.Call):
+                decorator = decorator.func
+            if ast.unparse(decorator) in ("cocotb.test", "test"):
+                tests.append(node.name)
+    return tests
+
+
+def shard_jobs(jobs, seeds=0, seed_tests="Random*", base_seed=0):
+    """
+    Split each job in one run per cocotb test.
+
+    Args
+        jobs: list of RegressionJob
+        seeds: number of seeded copies of the tests matching seed_tests
+               (0 keeps a single run with cocotb's default seed)
+        seed_tests: fnmatch pattern of the randomized test names
+        base_seed: seed of the first copy, the others follow
+
+    Returns a list of (job, test_options) pairs for run_regression().
+    """
+    runs = []
+    for job in jobs:
+        for test in discover_tests(job.module_path):
+            if seeds and fnmatch.fnmatchcase(test, seed_tests):
+                for seed in range(base_seed, base_seed + seeds):
+                    results_xml = f"{job.name}.{test}.seed{seed}.results.xml"
+                    options = dict(testcase=test, seed=seed, results_xml=results_xml)
+                    runs.append((job, options))
+            else:
+                results_xml = f"{job.name}.{test}.results.xml"
+                runs.append((job, dict(testcase=test, results_xml=results_xml)))
+    return runs
+
+
+# modules already imported by this process, by path
+_loaded_runners = {}
+
+
+def load_runner(job: RegressionJob):
+    """Import the module of a job and return its runner function."""
+    if job.module_path not in _loaded_runners:
+        # sibling modules (i.e. Lab06_MMC_Sqrt_solution) are imported at module level
+        sys.path.append(str(job.module_path.parent))
+        spec = importlib.util.spec_from_file_location(job.name, job.module_path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[job.name] = module
+        spec.loader.exec_module(module)
+        _loaded_runners[job.module_path] = getattr(module, job.runner_name)
+    return _loaded_runners[job.module_path]
+
+
+@contextmanager
+def redirect_output(log_file: Path):
+    """Send this process' stdout/stderr, and the simulator's, to log_file."""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = os.dup(1), os.dup(2)
+    with open(log_file, "w") as log:
+        os.dup2(log.fileno(), 1)
+        os.dup2(log.fileno(), 2)
+        try:
+            yield
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(saved[0], 1)
+            os.dup2(saved[1], 2)
+            os.close(saved[0])
+            os.close(saved[1])
+
+
+def worker_build_dir(shared_build: Path, output_dir: Path, lab: str) -> Path:
+    """
+    Return the private copy of a lab build for the calling worker process.
+
+    GHDL runs the simulation from its build directory, so each worker gets
+    its own copy, refreshed only when the shared build changed.
+    """
+    worker_build = output_dir / "workers" / f"worker_{os.getpid()}" / lab
+    shared_stamp = (shared_build / STAMP_NAME).read_text()
+    worker_stamp = worker_build / STAMP_NAME
+    if not worker_stamp.is_file() or worker_stamp.read_text() != shared_stamp:
+        shutil.rmtree(worker_build, ignore_errors=True)
+        shutil.copytree(shared_build, worker_build)
+    return worker_build
+
+
+def run_job(job: RegressionJob, output_dir: Path, test_options=None) -> JobResult:
+    """
+    Run one job in the calling (worker) process.
+
+    test_options are extra runner.test() arguments (testcase, seed, results_xml).
+    """
+    test_options = dict(test_options or {})
+    build_dir = worker_build_dir(output_dir / "build" / job.lab, output_dir, job.lab)
+    results_name = test_options.pop("results_xml", f"{job.name}.results.xml")
+    name = results_name[: -len(".results.xml")]
+    log_file = build_dir / f"{name}.log"
+
+    start = time.perf_counter()
+    results_xml, error = None, None
+    with redirect_output(log_file):
+        try:
+            runner = load_runner(job)
+            results_xml = runner(
+                build_dir=build_dir, results_xml=results_name, **test_options
+            )
+        except (Exception, SystemExit) as e:
+            error = f"{type(e).__name__}: {e}"
+    wall_time_s = time.perf_counter() - start
+    return JobResult(job, name, results_xml, log_file, wall_time_s, error)
+
+
+def build_all(jobs, output_dir: Path) -> None:
+    """Build each lab once, serially, in output_dir/build/<lab>."""
+    for job in jobs:
+        # labs with several modules share one build: the cache skips the others
+        load_runner(job)(build_dir=output_dir / "build" / job.lab, build_only=True)
+
+
+def merge_results(results, merged_file: Path):
+    """
+    Merge the xUnit files of all jobs in merged_file.
+
+    Each cocotb testsuite is renamed after its run (module, or module.test
+    for a shard), so shards of one module stay apart. A run without a results
+    file (simulator crash, build error) is reported as a failed testcase.
+
+    Returns the total number of tests and of failures.
+    """
+    merged = ET.Element("testsuites", name="results")
+    num_tests, num_failed = 0, 0
+    for result in results:
+        suites = []
+        if result.results_xml is not None and Path(result.results_xml).is_file():
+            suites = ET.parse(result.results_xml).getroot().iter("testsuite")
+        else:
+            suite = ET.Element("testsuite", name=result.name, package="all")
+            testcase = ET.SubElement(
+                suite, "testcase", name=result.name, classname=result.job.name
+            )
+            ET.SubElement(
+                testcase,
+                "failure",
+                message=result.error or "Simulation terminated abnormally",
+            )
+            suites = [suite]
+
+        for suite in suites:
+            suite.set("name", result.name)
+            merged.append(suite)
+            for testcase in suite.iter("testcase"):
+                num_tests += 1
+                num_failed += testcase.find("failure") is not None
+
+    ET.ElementTree(merged).write(merged_file, encoding="UTF-8", xml_declaration=True)
+    return num_tests, num_failed
+
+
+def merge_coverage(output_dir: Path, since: float) -> None:
+    """Merge the coverage databases written by the workers after `since` (wall time)."""
+    databases = [
+        path
+        for path in sorted((output_dir / "workers").glob(f"*/*/*{COVERAGE_SUFFIX}"))
+        # the worker directories are reused: skip the databases of older runs
+        if path.stat().st_mtime >= since
+    ]
+    if not databases:
+        return
+    merged = merge_databases(databases)
+    merged_file = output_dir / f"coverage{COVERAGE_SUFFIX}"
+    merged_file.write_text(json.dumps(merged.as_dict()))
+    for point in merged.points.values():
+        print(f"coverage {point.summary()}")
+    print(f"{len(databases)} coverage databases merged: {merged_file}")
+
+
+def count_results(result: JobResult):
+    """Return the number of tests and failures of one job."""
+    if result.results_xml is None or not Path(result.results_xml).is_file():
+        return 1, 1
+    testcases = list(ET.parse(result.results_xml).getroot().iter("testcase"))
+    failed = sum(testcase.find("failure") is not None for testcase in testcases)
+    return len(testcases), failed
+
+
+def print_report(results, wall_time_s: float) -> None:
+    print(f"{'run':<70} {'tests':>5} {'fail':>5} {'time (s)':>9}")
+    for result in results:
+        tests, failed = count_results(result)
+        print(
+            f"{result.name:<70} {tests:>5} {failed:>5} {result.wall_time_s:>9.2f}"
+        )
+        if failed:
+            print(f"    log: {result.log_file}")
+            if result.error:
+                print(f"    {result.error}")
+    serial_time_s = sum(result.wall_time_s for result in results)
+    print(
+        f"wall time {wall_time_s:.2f} s, serial time {serial_time_s:.2f} s, "
+        f"speedup {serial_time_s / max(wall_time_s, 1e-9):.2f}x"
+    )
+
+
+def run_regression(jobs, output_dir: Path, max_workers=None):
+    """
+    Build, then run all jobs in a process pool.
+
+    Args
+        jobs: list of (job, test_options) pairs; test_options are extra
+              runner.test() arguments for that run, or None
+        output_dir: root of the regression outputs
+        max_workers: size of the process pool (default: number of cores)
+
+    Returns the list of JobResult, in the order of jobs.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    build_all(list(dict.fromkeys(job for job, _ in jobs)), output_dir)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(run_job, job, output_dir, options): index
+            for index, (job, options) in enumerate(jobs)
+        }
+        results = [None] * len(jobs)
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            status = "FAIL" if result.error or count_results(result)[1] else "PASS"
+            print(f"{status} {result.name} ({result.wall_time_s:.2f} s)")
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "labs", nargs="*", help="lab directories to run, i.e. Lab06 (default: all)"
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=os.cpu_count(), help="number of workers"
+    )
+    parser.add_argument(
+        "-o", "--output", default="regression_build", help="output directory"
+    )
+    parser.add_argument(
+        "--shard", action="store_true", help="run each cocotb test in its own process"
+    )
+    parser.add_argument(
+        "--seeds",
+        type=int,
+        default=0,
+        help="with --shard, number of seeded copies of the randomized tests",
+    )
+    parser.add_argument(
+        "--seed-tests",
+        default="Random*",
+        help="pattern of the randomized test names (default: %(default)s)",
+    )
+    parser.add_argument("--base-seed", type=int, default=0, help="first seed")
+    parser.add_argument(
+        "--log-levels",
+        help="per-component log levels of the tests, i.e. cocotb.base=WARNING "
+        "(sets RT2024_LOG_LEVELS, see log_control.py)",
+    )
+    parser.add_argument(
+        "--transport",
+        choices=("uart", "backdoor"),
+        help="transport of the Lab06 environments, backdoor skips the UART "
+        "bit timing (sets RT2024_TRANSPORT)",
+    )
+    parser.add_argument(
+        "--timing",
+        choices=("realistic", "fast"),
+        help="clock and UART bit timing of the UART labs (sets RT2024_TIMING, "
+        "see timing_config.py)",
+    )
+    args = parser.parse_args(argv)
+
+    jobs = discover_jobs(args.labs)
+    if not jobs:
+        parser.error("no runner found")
+    output_dir = Path(args.output).resolve()
+    if args.log_levels is not None:
+        # inherited by the workers, then by the simulators
+        os.environ["RT2024_LOG_LEVELS"] = args.log_levels
+    if args.transport is not None:
+        os.environ["RT2024_TRANSPORT"] = args.transport
+    if args.timing is not None:
+        os.environ["RT2024_TIMING"] = args.timing
+
+    if args.shard:
+        runs = shard_jobs(jobs, args.seeds, args.seed_tests, args.base_seed)
+    else:
+        runs = [(job, None) for job in jobs]
+
+    start_time = time.time()
+    start = time.perf_counter()
+    results = run_regression(runs, output_dir, args.jobs)
+    wall_time_s = time.perf_counter() - start
+
+    print_report(results, wall_time_s)
+    num_tests, num_failed = merge_results(results, output_dir / "results.xml")
+    print(f"{num_tests} tests, {num_failed} failed: {output_dir / 'results.xml'}")
+    merge_coverage(output_dir, since=start_time)
+    return 1 if num_failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
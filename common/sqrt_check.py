@@ -0,0 +1,40 @@
+# This file is public domain, it can be freely copied without restrictions.
+# SPDX-License-Identifier: CC0-1.0
+"""
+Check of one square root transaction, shared by the MMC_sqrt checker of
+Lab06 during the simulation and the offline replay of txn_recorder.py, so
+that a replayed check gives the same verdict as the live one.
+
+Arguments and results are paired in order by the caller. A transaction
+fails when its argument has X/Z bits (None), when its result differs from
+the model, or when its latency differs from the expected one:
+
+    cycles = latency_cycles(argument_time, result_time, period)
+    failure = check_transaction(argument, result, math.isqrt(argument), cycles, 4)
+    assert failure is None, failure
+"""
+
+
+def latency_cycles(argument_time, result_time, period) -> int:
+    """Return the latency of a transaction in clock cycles (times and period in one unit)."""
+    return round((result_time - argument_time) / period)
+
+
+def check_transaction(argument, result, expected, cycles=None, expected_latency=None):
+    """
+    Return the failure message of a transaction, None when it passes.
+
+    Args
+        argument: argument of the transaction, None for X/Z bits
+        result: result of the transaction
+        expected: model result of argument (ignored when argument is None)
+        cycles: latency of the transaction in clock cycles
+        expected_latency: latency to check in clock cycles, None not to check it
+    """
+    if argument is None:
+        return f"argument with X/Z bits, result {result}"
+    if result != expected:
+        return f"argument {argument}: result {result}, expected {expected}"
+    if expected_latency is not None and cycles != expected_latency:
+        return f"argument {argument}: result after {cycles} cycles, expected {expected_latency}"
+    return None
@@ -0,0 +1,88 @@
+# This file is public domain, it can be freely copied without restrictions.
+# SPDX-License-Identifier: CC0-1.0
+# Tests of the coverage bitmaps, database merge and closure stimulus:
+#     python -m pytest common/test_functional_coverage.py
+
+import random
+
+import cocotb
+import pytest
+
+from functional_coverage import (
+    CoverageCollector,
+    CoverPoint,
+    closure_stimulus,
+    even_ranges,
+    merge_databases,
+)
+
+
+def collector(values, unknown=0):
+    coverage = CoverageCollector("run")
+    point = coverage.add_point("argument", width=4, ranges=even_ranges(4, 2))
+    for value in values:
+        point.sample(value)
+    for _ in range(unknown):
+        point.sample(None)
+    return coverage
+
+
+def test_sample():
+    point = collector([0, 3, 3, 15], unknown=2).points["argument"]
+    assert point.covered_count() == 3
+    assert point.covered(3) and not point.covered(4)
+    assert point.samples == 6 and point.unknown == 2
+    assert point.range_hits == [3, 1]
+    assert point.percent() == 100 * 3 / 16
+
+
+def test_write_and_merge(tmp_path, monkeypatch):
+    monkeypatch.setattr(cocotb, "RANDOM_SEED", 7)
+    first = collector([0, 1, 9], unknown=1).write(tmp_path)
+    monkeypatch.setattr(cocotb, "RANDOM_SEED", 8)
+    second = collector([1, 15]).write(tmp_path)
+    # seeded copies of a test do not overwrite each other
+    assert first.name == "run.7.coverage.json" and second.name == "run.8.coverage.json"
+
+    point = merge_databases([first, second]).points["argument"]
+    assert point.uncovered() == [2, 3, 4, 5, 6, 7, 8, 10, 11, 12, 13, 14]
+    assert point.covered_count() == 4
+    assert point.samples == 6 and point.unknown == 1
+    assert point.range_hits == [3, 2]
+
+
+def test_merge_different_bins():
+    point = CoverPoint("argument", width=4)
+    with pytest.raises(ValueError, match="different bins"):
+        point.merge(CoverPoint("argument", width=5))
+
+
+def test_closure_stimulus_sends_each_uncovered_value_once():
+    point = collector([0, 5]).points["argument"]
+    sent = []
+    for value in closure_stimulus(point, rng=random.Random(1)):
+        sent.append(value)
+        point.sample(value)
+    assert sorted(sent) == [value for value in range(16) if value not in (0, 5)]
+    assert point.percent() == 100.0
+
+
+def test_closure_stimulus_stops_at_target():
+    point = collector([]).points["argument"]
+    sent = 0
+    for value in closure_stimulus(point, target=50.0, rng=random.Random(1)):
+        sent += 1
+        point.sample(value)
+    assert sent == 8
+
+
+def test_closure_stimulus_skips_values_covered_meanwhile():
+    point = collector([]).points["argument"]
+    sent = []
+    for value in closure_stimulus(point, rng=random.Random(1)):
+        sent.append(value)
+        # a result covers the next value too
+        point.sample(value)
+        point.sample(min(value + 1, 15))
+    assert len(sent) == len(set(sent)) < 16
+    assert point.percent() == 100.0
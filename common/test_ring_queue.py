@@ -0,0 +1,83 @@
+# This file is public domain, it can be freely copied without restrictions.
+# SPDX-License-Identifier: CC0-1.0
+# Tests of the RingQueue of the Lab06 MMC_sqrt checker, outside a simulation:
+#     python -m pytest common/test_ring_queue.py
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "Lab06" / "solution"))
+
+from Lab06_MMC_Sqrt_solution import (  # noqa: E402
+    MAX_RING_WIDTH,
+    DataValidMonitor,
+    RingQueue,
+    transaction_record,
+)
+
+Record = transaction_record(("a", "b"))
+
+
+class Handle:
+    """Stand-in for a data handle, of which DataValidMonitor only reads the width at creation"""
+
+    def __init__(self, width):
+        self.width = width
+
+    def __len__(self):
+        return self.width
+
+
+def drain(queue):
+    items = []
+    while not queue.empty():
+        items.append(queue.get_nowait())
+    return items
+
+
+def test_order_kept_across_wrap_and_growth():
+    queue = RingQueue(Record, capacity=2)
+    queue.put_nowait((1, 10))
+    queue.put_nowait((2, 20))
+    assert queue.get_nowait() == (1, 10)
+    # the tail wraps to the start of the ring, then the ring is full and grows
+    queue.put_nowait((3, 30))
+    queue.put_nowait((4, 40))
+    assert queue.qsize() == 3
+    assert drain(queue) == [(2, 20), (3, 30), (4, 40)]
+
+
+def test_records_readable_by_name():
+    queue = RingQueue(Record)
+    queue.put_nowait((5, 6))
+    record = queue.get_nowait()
+    assert record.a == 5 and record["b"] == 6
+
+
+def test_unknown_values_round_trip():
+    queue = RingQueue(Record)
+    queue.put_nowait((None, 7))
+    queue.put_nowait((-1, None))
+    # -1 is a value, only None (X/Z) comes back as None
+    assert drain(queue) == [(None, 7), (-1, None)]
+
+
+def test_widest_values_round_trip():
+    largest = 2**MAX_RING_WIDTH - 1
+    queue = RingQueue(Record)
+    queue.put_nowait((largest, 0))
+    assert queue.get_nowait() == (largest, 0)
+
+
+def test_wider_values_rejected():
+    queue = RingQueue(Record)
+    with pytest.raises(OverflowError):
+        queue.put_nowait((2**MAX_RING_WIDTH, 0))
+
+
+def test_monitor_rejects_wide_signals_for_ring():
+    datas = {"a": Handle(8), "b": Handle(MAX_RING_WIDTH + 1)}
+    with pytest.raises(ValueError, match="at most"):
+        DataValidMonitor(clk=None, datas=datas, valid=None, record="ring")
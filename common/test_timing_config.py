@@ -0,0 +1,58 @@
+# This file is public domain, it can be freely copied without restrictions.
+# SPDX-License-Identifier: CC0-1.0
+# Tests of the timing profiles and of the baud rate rounding:
+#     python -m pytest common/test_timing_config.py
+
+import pytest
+
+from timing_config import (
+    MIN_CLKS_PER_BIT,
+    PROFILES,
+    TimingConfig,
+    check_timing,
+    timing_from_env,
+    timing_profile,
+)
+
+CONFIGS = list(PROFILES.values()) + [
+    TimingConfig(clock_period_ns=period, clks_per_bit=clks)
+    for period in (1, 3, 7, 10, 33, 100)
+    for clks in (MIN_CLKS_PER_BIT, 5, 10, 13, 16, 87)
+]
+
+
+@pytest.mark.parametrize("timing", CONFIGS)
+def test_baud_gives_exact_bit_time(timing):
+    # bit time computed by the cocotbext UART models
+    assert int(1e9 / timing.baud) == timing.bit_time_ns
+
+
+def test_profiles_are_legal():
+    for name, timing in PROFILES.items():
+        assert timing_profile(name) == timing
+
+
+def test_unknown_profile():
+    with pytest.raises(ValueError, match="expected one of"):
+        timing_profile("slow")
+
+
+def test_check_timing():
+    with pytest.raises(ValueError, match="at least"):
+        check_timing(TimingConfig(clock_period_ns=100, clks_per_bit=MIN_CLKS_PER_BIT - 1))
+    with pytest.raises(ValueError, match="clock period"):
+        check_timing(TimingConfig(clock_period_ns=0, clks_per_bit=10))
+
+
+def test_env_round_trip(monkeypatch):
+    timing = TimingConfig(clock_period_ns=20, clks_per_bit=8)
+    for name, value in timing.env().items():
+        monkeypatch.setenv(name, value)
+    assert timing_from_env() == timing
+    assert timing.parameters() == {"g_CLKS_PER_BIT": 8}
+
+
+def test_env_defaults_to_profile(monkeypatch):
+    monkeypatch.delenv("RT2024_CLKS_PER_BIT", raising=False)
+    monkeypatch.setenv("RT2024_TIMING", "fast")
+    assert timing_from_env() == PROFILES["fast"]
@@ -0,0 +1,81 @@
+# This file is public domain, it can be freely copied without restrictions.
+# SPDX-License-Identifier: CC0-1.0
+# Tests of the transaction record files and of their replay, on records
+# written without a simulator:
+#     python -m pytest common/test_txn_recorder.py
+
+import pytest
+
+from txn_recorder import TransactionRecorder, read_transactions, replay
+
+INSTANCE = "top.inst_square_root"
+
+
+def write_run(path, transactions):
+    """Append one run of (direction, time_ps, value) square root transactions."""
+    recorder = TransactionRecorder(path)
+    streams = {
+        "input": recorder.stream(f"{INSTANCE}.input", ["Argument"]),
+        "output": recorder.stream(f"{INSTANCE}.output", ["SqrtResult"]),
+    }
+    for direction, time_ps, value in transactions:
+        recorder.record_ps(streams[direction], [value], time_ps)
+    recorder.close()
+
+
+@pytest.fixture
+def records(tmp_path):
+    path = tmp_path / "run.txn"
+    write_run(path, [("input", 1000, 16), ("output", 401000, 4), ("input", 500000, None)])
+    write_run(path, [("input", 0, 64), ("output", 300000, 8)])
+    return path
+
+
+def test_round_trip(records):
+    assert list(read_transactions(records)) == [
+        (0, f"{INSTANCE}.input", 1000, {"Argument": 16}),
+        (0, f"{INSTANCE}.output", 401000, {"SqrtResult": 4}),
+        (0, f"{INSTANCE}.input", 500000, {"Argument": None}),
+        (1, f"{INSTANCE}.input", 0, {"Argument": 64}),
+        (1, f"{INSTANCE}.output", 300000, {"SqrtResult": 8}),
+    ]
+
+
+def test_truncated_file(records):
+    data = records.read_bytes()
+    records.write_bytes(data[:-3])
+    transactions = list(read_transactions(records))
+    # the last transaction was cut short, the others are intact
+    assert len(transactions) == 4
+    assert transactions[-1] == (1, f"{INSTANCE}.input", 0, {"Argument": 64})
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty.txn"
+    path.touch()
+    assert list(read_transactions(path)) == []
+
+
+def test_replay_latency_in_cycles(records):
+    checked, failures, latency = replay([records], period_ns=100, expected_latency=4)
+    # the arguments of a run are not paired with the results of another one
+    assert checked == 2
+    assert latency == {4: 1, 3: 1}
+    assert len(failures) == 1
+    assert "argument 64: result after 3 cycles, expected 4" in failures[0]
+
+
+def test_replay_model(records):
+    checked, failures, latency = replay([records], model=lambda value: value // 4)
+    assert checked == 2
+    assert latency == {400.0: 1, 300.0: 1}
+    assert len(failures) == 1
+    assert "argument 64: result 8, expected 16" in failures[0]
+
+
+def test_replay_unknown_argument(tmp_path):
+    path = tmp_path / "xz.txn"
+    write_run(path, [("input", 0, None), ("output", 400000, 0)])
+    checked, failures, _ = replay([path])
+    assert checked == 1
+    assert "argument with X/Z bits, result 0" in failures[0]
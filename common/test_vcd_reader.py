@@ -0,0 +1,57 @@
+# This file is public domain, it can be freely copied without restrictions.
+# SPDX-License-Identifier: CC0-1.0
+# Tests of the VCD reader queries, on a small hand-written VCD file:
+#     python -m pytest common/test_vcd_reader.py
+
+import pytest
+
+from vcd_reader import VcdIndex
+
+VCD = """$timescale 1ns $end
+$scope module top $end
+$var wire 1 ! valid $end
+$var wire 4 " data [3:0] $end
+$upscope $end
+$enddefinitions $end
+#0
+$dumpvars
+0!
+b0000 "
+$end
+#200
+1!
+b0101 "
+#300
+0!
+#400
+1!
+b1001 "
+#500
+0!
+"""
+
+
+@pytest.fixture
+def vcd(tmp_path):
+    path = tmp_path / "waves.vcd"
+    path.write_text(VCD)
+    index = VcdIndex(path)
+    yield index
+    index.close()
+
+
+def test_edges(vcd):
+    assert vcd.edges("valid") == [200, 400]
+    assert vcd.edges("valid", rising=False) == [300, 500]
+
+
+def test_edges_in_window(vcd):
+    # the edge at 200 is the first change inside the window
+    assert vcd.edges("valid", t0=150) == [200, 400]
+    assert vcd.edges("valid", t0=200) == [200, 400]
+    assert vcd.edges("valid", t0=250, t1=450) == [400]
+    assert vcd.edges("valid", t0="150ns", t1="350ns") == [200]
+
+
+def test_sample_on_edges_in_window(vcd):
+    assert vcd.sample_on_edges("data", "valid", t0=150) == [(200, "0101"), (400, "1001")]
@@ -0,0 +1,80 @@
+# This file is public domain, it can be freely copied without restrictions.
+# SPDX-License-Identifier: CC0-1.0
+# Tests of the waveform time windows and of the VCD trim:
+#     python -m pytest common/test_waveforms.py
+
+import math
+
+import pytest
+
+from waveforms import parse_time_fs, parse_windows, read_window_events, trim_vcd
+
+HEADER = """$timescale 1ns $end
+$scope module top $end
+$var wire 1 ! valid $end
+$var wire 4 " data [3:0] $end
+$upscope $end
+$enddefinitions $end
+"""
+
+VCD = HEADER + """#0
+$dumpvars
+0!
+b0000 "
+$end
+#200
+1!
+b0101 "
+#300
+0!
+#400
+1!
+b1001 "
+#500
+0!
+"""
+
+NS = 10**6
+
+
+def test_parse_windows():
+    assert parse_time_fs("2.5 us") == 2500 * NS
+    assert parse_windows("10us:2ms,3ms:") == [(10000 * NS, 2000000 * NS), (3000000 * NS, math.inf)]
+    with pytest.raises(ValueError, match="invalid time"):
+        parse_time_fs("10 cycles")
+
+
+def test_read_window_events(tmp_path):
+    events = tmp_path / "events.txt"
+    events.write_text("start 100\nstop 200\nstart 300\n")
+    assert read_window_events(events) == [(100, 200), (300, math.inf)]
+
+
+def test_trim_window_starts_with_current_values(tmp_path):
+    vcd = tmp_path / "waves.vcd"
+    vcd.write_text(VCD)
+    trimmed = tmp_path / "trimmed.vcd"
+    trim_vcd(vcd, [(250 * NS, 400 * NS)], trimmed)
+    # the values at 250 ns are dumped at the window start, nothing after 400 ns is kept
+    assert trimmed.read_text() == HEADER + """#250
+$dumpvars
+1!
+b0101 "
+$end
+#300
+0!
+#400
+1!
+b1001 "
+"""
+
+
+def test_trim_merges_overlapping_windows(tmp_path):
+    vcd = tmp_path / "waves.vcd"
+    vcd.write_text(VCD)
+    trim_vcd(vcd, [(300 * NS, 450 * NS), (0, 100 * NS), (250 * NS, 350 * NS)])
+    # replaced in place, each merged window opens with a $dumpvars
+    text = vcd.read_text()
+    assert text.count("$dumpvars") == 2
+    assert "#0\n$dumpvars" in text and "#250\n$dumpvars" in text
+    assert "#200\n" not in text and "#500\n" not in text
@@ -0,0 +1,108 @@
+# This file is public domain, it can be freely copied without restrictions.
+# SPDX-License-Identifier: CC0-1.0
+"""
+Clock and UART bit timing of the rt2024mysystemtop labs, from one configuration.
+
+The VHDL UARTs count g_CLKS_PER_BIT clock cycles per bit, while the test
+clock and the cocotbext UART models need a period and a baud rate. The
+runners pass the generic and the environment of a timing profile:
+
+    timing = timing_profile()           # RT2024_TIMING, default "realistic"
+    runner.test(..., parameters=timing.parameters(), extra_env=timing.env())
+
+and the tests read the same values back:
+
+    timing = timing_from_env()
+    Clock(dut.clk, timing.clock_period_ns, "ns")
+    UartSource(dut.rx_uart_serial_in, baud=timing.baud, bits=8)
+
+Profiles:
+
+    realistic   100 ns clock, 10 clocks per bit (1 Mbaud)
+    fast        100 ns clock, MIN_CLKS_PER_BIT clocks per bit
+
+MIN_CLKS_PER_BIT comes from a cycle model of uart_rx: its 2-register input
+synchronizer and the start bit check at (g_CLKS_PER_BIT-1)/2 receive
+back-to-back frames with 1 stop bit, at any phase of the serial data versus
+the clock, from 4 clocks per bit (3 with 2 stop bits). Below, the start
+bit check lands in the next bit.
+"""
+
+import math
+import os
+from typing import NamedTuple
+
+MIN_CLKS_PER_BIT = 4
+
+
+class TimingConfig(NamedTuple):
+    """Clock period and UART bit length of the toplevel"""
+
+    clock_period_ns: int
+    clks_per_bit: int
+
+    @property
+    def bit_time_ns(self) -> int:
+        return self.clock_period_ns * self.clks_per_bit
+
+    @property
+    def baud(self) -> float:
+        """
+        Baud rate of the cocotbext UART models.
+
+        They truncate the bit time to whole ns (int(1e9 / baud)), so the rate
+        is rounded down until the bit time comes out exact.
+        """
+        baud = 1e9 / self.bit_time_ns
+        while int(1e9 / baud) < self.bit_time_ns:
+            baud = math.nextafter(baud, 0)
+        return baud
+
+    def parameters(self):
+        """Generics of rt2024mysystemtop, for runner.build() and runner.test()."""
+        return {"g_CLKS_PER_BIT": self.clks_per_bit}
+
+    def env(self):
+        """Environment of the simulator, read back by timing_from_env()."""
+        return {
+            "RT2024_CLOCK_PERIOD_NS": str(self.clock_period_ns),
+            "RT2024_CLKS_PER_BIT": str(self.clks_per_bit),
+        }
+
+
+PROFILES = {
+    "realistic": TimingConfig(clock_period_ns=100, clks_per_bit=10),
+    "fast": TimingConfig(clock_period_ns=100, clks_per_bit=MIN_CLKS_PER_BIT),
+}
+
+
+def check_timing(timing: TimingConfig) -> TimingConfig:
+    """Return timing, ValueError if the UART receiver cannot work with it."""
+    if timing.clks_per_bit < MIN_CLKS_PER_BIT:
+        raise ValueError(
+            f"{timing.clks_per_bit} clocks per bit, uart_rx needs at least {MIN_CLKS_PER_BIT}"
+        )
+    if timing.clock_period_ns <= 0:
+        raise ValueError(f"invalid clock period {timing.clock_period_ns} ns")
+    return timing
+
+
+def timing_profile(name=None) -> TimingConfig:
+    """Return the timing profile name (default: RT2024_TIMING, else "realistic")."""
+    if name is None:
+        name = os.getenv("RT2024_TIMING", "realistic")
+    if name not in PROFILES:
+        raise ValueError(f"timing profile {name!r}: expected one of {', '.join(PROFILES)}")
+    return check_timing(PROFILES[name])
+
+
+def timing_from_env() -> TimingConfig:
+    """Return the timing the runner passed to the simulator, else the profile."""
+    if "RT2024_CLKS_PER_BIT" not in os.environ:
+        return timing_profile()
+    return check_timing(
+        TimingConfig(
+            clock_period_ns=int(os.environ["RT2024_CLOCK_PERIOD_NS"]),
+            clks_per_bit=int(os.environ["RT2024_CLKS_PER_BIT"]),
+        )
+    )
@@ -0,0 +1,301 @@
+# This file is public domain, it can be freely copied without restrictions.
+# SPDX-License-Identifier: CC0-1.0
+"""
+Binary transaction recorder, and offline replay of the recorded checks.
+
+The recorder appends every transaction of the hooked DataValidMonitor
+instances, and any other value stream (the UART bytes), with its
+simulation time to a compact binary file:
+
+    recorder = TransactionRecorder.from_env("Lab06_Environment_solution.RandomTestClass")
+    if recorder:
+        recorder.hook(checker.input_mon, "rt2024mysystemtop.inst_square_root.input", ["Argument"])
+        uart_tx = recorder.stream("uart.tx", ["Byte"])
+        recorder.record(uart_tx, [value])
+        recorder.close()
+
+Recording is off unless RT2024_RECORD_DIR is set; the file is then
+<RT2024_RECORD_DIR>/<name>.<seed>.txn, appended to by each run.
+
+The replay re-checks the recorded square root results, against math.isqrt
+or any other model, without simulating again:
+
+    python common/txn_recorder.py replay run.txn
+    python common/txn_recorder.py replay --model mymodels:fixed_sqrt --period-ns 100 --latency 4 *.txn
+    python common/txn_recorder.py dump run.txn
+
+File format (little endian): each run starts with MAGIC, then
+    declaration  u16 0, u32 n, n bytes of JSON {"id", "name", "fields"}
+    transaction  u16 stream id, u64 time (ps), one i64 per field
+X/Z values are stored as UNKNOWN. The reader maps the file in memory.
+"""
+
+import argparse
+import importlib
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+from collections import Counter, defaultdict, deque
+from pathlib import Path
+
+from sqrt_check import check_transaction, latency_cycles
+
+try:
+    from cocotb.utils import get_sim_time, get_time_from_sim_steps
+except ImportError:
+    # replay and dump only, outside of a simulation
+    get_sim_time = get_time_from_sim_steps = None
+
+MAGIC = b"RT24TXN\x01"
+RECORD_SUFFIX = ".txn"
+
+# value stored for X/Z samples
+UNKNOWN = -(2**63)
+
+_DECLARATION = struct.Struct("<HI")
+
+
+def _int_or_none(value):
+    """Return a sampled value (int, None or BinaryValue) as an int or None."""
+    if value is None or isinstance(value, int):
+        return value
+    try:
+        return value.integer
+    except ValueError:
+        return None
+
+
+class TransactionRecorder:
+    """
+    Appends timestamped transactions to a binary file
+
+    Args
+        path: file to append to (created if needed)
+        buffering: write buffer size in bytes, the file is written in blocks
+    """
+
+    def __init__(self, path, buffering=1 << 16):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "ab", buffering=buffering)
+        self._file.write(MAGIC)
+        # stream id -> struct of its transactions
+        self._structs = {}
+        self.count = 0
+        # picoseconds per simulator step, from the first record() (the
+        # simulator precision is only known during the simulation)
+        self._ps_per_step = None
+
+    @classmethod
+    def from_env(cls, name):
+        """Return the recorder of run name in RT2024_RECORD_DIR, None when not set."""
+        directory = os.getenv("RT2024_RECORD_DIR")
+        if not directory:
+            return None
+        import cocotb
+
+        # seeded copies of a test may run in the same directory
+        return cls(Path(directory) / f"{name}.{cocotb.RANDOM_SEED}{RECORD_SUFFIX}")
+
+    def stream(self, name, fields) -> int:
+        """Declare a stream of transactions with these integer fields, return its id."""
+        stream_id = len(self._structs) + 1
+        declaration = json.dumps(
+            {"id": stream_id, "name": name, "fields": list(fields)}
+        ).encode()
+        self._file.write(_DECLARATION.pack(0, len(declaration)) + declaration)
+        self._structs[stream_id] = struct.Struct("<HQ" + "q" * len(fields))
+        return stream_id
+
+    def record(self, stream_id, values, time_steps=None) -> None:
+        """
+        Append one transaction of a stream.
+
+        time_steps is its simulation time in simulator steps (default: now).
+        """
+        if time_steps is None:
+            time_steps = get_sim_time("step")
+        if self._ps_per_step is None:
+            self._ps_per_step = get_time_from_sim_steps(1, "ps")
+        self.record_ps(stream_id, values, round(time_steps * self._ps_per_step))
+
+    def record_ps(self, stream_id, values, time_ps) -> None:
+        """Append one transaction of a stream at a time in ps, without a simulator."""
+        self._file.write(
+            self._structs[stream_id].pack(
+                stream_id,
+                time_ps,
+                *(UNKNOWN if value is None else value for value in map(_int_or_none, values)),
+            )
+        )
+        self.count += 1
+
+    def hook(self, monitor, name, fields) -> int:
+        """Record the fields of each transaction of a DataValidMonitor as stream name."""
+        stream_id = self.stream(name, fields)
+
+        def record(transaction):
+            # monitors with timestamps: time of the valid cycle
+            try:
+                time_steps = transaction["time"]
+            except (KeyError, AttributeError):
+                time_steps = None
+            self.record(stream_id, [transaction[field] for field in fields], time_steps)
+
+        monitor.callbacks.append(record)
+        return stream_id
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def read_transactions(path):
+    """
+    Yield the transactions of a record file in order.
+
+    Each one is (run, stream name, time in ps, {field: value}), run counting
+    the runs appended to the file from 0, and X/Z values being None.
+    """
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            run = -1
+            streams = {}
+            offset = 0
+            while offset < len(data):
+                if data[offset] == MAGIC[0] and data[offset : offset + len(MAGIC)] == MAGIC:
+                    run += 1
+                    streams = {}
+                    offset += len(MAGIC)
+                    continue
+                if offset + _DECLARATION.size > len(data):
+                    return
+                stream_id, length = _DECLARATION.unpack_from(data, offset)
+                if stream_id == 0:
+                    offset += _DECLARATION.size
+                    declaration = json.loads(data[offset : offset + length])
+                    streams[declaration["id"]] = (
+                        declaration["name"],
+                        declaration["fields"],
+                        struct.Struct("<HQ" + "q" * len(declaration["fields"])),
+                    )
+                    offset += length
+                    continue
+                name, fields, layout = streams[stream_id]
+                if offset + layout.size > len(data):
+                    # last transaction cut short by a killed simulation
+                    return
+                _, time_ps, *values = layout.unpack_from(data, offset)
+                offset += layout.size
+                yield run, name, time_ps, {
+                    field: None if value == UNKNOWN else value
+                    for field, value in zip(fields, values)
+                }
+
+
+def load_model(spec):
+    """Return the function of a "module:function" spec, i.e. "math:isqrt"."""
+    module, _, function = spec.partition(":")
+    if not function:
+        raise ValueError(f"invalid model {spec!r}, expected module:function")
+    return getattr(importlib.import_module(module), function)
+
+
+def replay(
+    paths,
+    model=math.isqrt,
+    argument="Argument",
+    result="SqrtResult",
+    period_ns=None,
+    expected_latency=None,
+):
+    """
+    Check the recorded results of the square_root instances against model.
+
+    Results ("<instance>.output" streams) are paired in order with the
+    arguments ("<instance>.input" streams) of the same instance and run, as
+    MMC_sqrt does during the simulation, and checked by the same
+    check_transaction() (see sqrt_check.py).
+
+    Returns (checked count, failure messages, latency Counter), the latency
+    in clock cycles when period_ns is given, else in ns. expected_latency
+    (cycles, needs period_ns) is checked too.
+    """
+    checked = 0
+    failures = []
+    latency = Counter()
+    for path in paths:
+        arguments = defaultdict(deque)
+        for run, name, time_ps, values in read_transactions(path):
+            instance, _, direction = name.rpartition(".")
+            if direction == "input":
+                arguments[run, instance].append((time_ps, values[argument]))
+                continue
+            if direction != "output":
+                continue
+            pending = arguments[run, instance]
+            if not pending:
+                failures.append(f"{path}: run {run}, {instance}: result without argument")
+                continue
+            argument_ps, value = pending.popleft()
+            if period_ns:
+                delay = latency_cycles(argument_ps, time_ps, period_ns * 1000)
+            else:
+                delay = (time_ps - argument_ps) / 1000
+            latency[delay] += 1
+            failure = check_transaction(
+                value,
+                values[result],
+                None if value is None else model(value),
+                delay,
+                expected_latency,
+            )
+            if failure is not None:
+                failures.append(f"{path}: run {run}, {instance} at {time_ps / 1000:.0f} ns: {failure}")
+            checked += 1
+    return checked, failures, latency
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay and dump transaction records.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    check = commands.add_parser("replay", help="check the recorded results against a model")
+    check.add_argument("records", nargs="+", help="record files")
+    check.add_argument(
+        "--model", default="math:isqrt", help="model, as module:function (default: %(default)s)"
+    )
+    check.add_argument("--period-ns", type=float, help="clock period, for latencies in cycles")
+    check.add_argument("--latency", type=int, help="expected latency in cycles (with --period-ns)")
+    check.add_argument("--max-reported", type=int, default=10, help="failures printed")
+    dump = commands.add_parser("dump", help="print the recorded transactions")
+    dump.add_argument("records", nargs="+", help="record files")
+    args = parser.parse_args(argv)
+
+    if args.command == "dump":
+        for path in args.records:
+            for run, name, time_ps, values in read_transactions(path):
+                print(f"{run} {time_ps / 1000:>14.1f} ns {name} {values}")
+        return 0
+
+    if args.latency is not None and args.period_ns is None:
+        parser.error("--latency needs --period-ns")
+    checked, failures, latency = replay(
+        args.records,
+        model=load_model(args.model),
+        period_ns=args.period_ns,
+        expected_latency=args.latency,
+    )
+    for failure in failures[: args.max_reported]:
+        print(failure)
+    unit = "cycles" if args.period_ns else "ns"
+    print(f"latency ({unit}): {dict(sorted(latency.items()))}")
+    print(f"{checked} results checked with {args.model}, {len(failures)} failed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
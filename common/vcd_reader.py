@@ -0,0 +1,306 @@
+# This file is public domain, it can be freely copied without restrictions.
+# SPDX-License-Identifier: CC0-1.0
+"""
+Streaming, indexed reader for the VCD files written by the lab simulations.
+
+The VCD file is parsed once, line by line, into an SQLite index stored next
+to it (<file>.vcd.idx). Later queries only read the index, and the index is
+rebuilt automatically when the VCD file changes. Memory stays bounded by the
+number of signals, whatever the length of the simulation.
+
+    from vcd_reader import VcdIndex
+
+    vcd = VcdIndex("sim_build/Lab06_waveforms.vcd")
+    # value of sqrt_res at every rising edge of sqrt_valid
+    results = vcd.sample_on_edges("inst_square_root.sqrt_res", "sqrt_valid")
+    # all transitions of the UART output between 100 us and 200 us
+    bits = vcd.transitions("tx_uart_serial_out", "100us", "200us")
+    # cycles from arg_valid to sqrt_valid, for a 100 ns clock
+    cycles = [t / vcd.ticks("100ns") for t in vcd.latencies("arg_valid", "sqrt_valid")]
+
+Signals are named by their dotted hierarchical path; any unambiguous suffix
+of it works ("sqrt_valid", "inst_square_root.sqrt_res"). Times are integers in
+VCD ticks, or strings with a unit ("10us"). The module is also a command
+line tool, see --help.
+"""
+
+import argparse
+import os
+import sqlite3
+from pathlib import Path
+
+from waveforms import parse_time_fs
+
+# rows buffered before each insert in the index, bounds the parser memory
+BATCH_SIZE = 50000
+
+_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE signals (name TEXT PRIMARY KEY, code INTEGER, width INTEGER);
+CREATE TABLE changes (code INTEGER, time INTEGER, value TEXT);
+"""
+
+
+def int_value(value):
+    """Convert a VCD value ("1", "0101") to an integer, None if it has x/z/u bits."""
+    try:
+        return int(value, 2)
+    except ValueError:
+        return None
+
+
+class VcdIndex:
+    """
+    On-disk time/signal index of a VCD file
+
+    Args
+        vcd_path: VCD file to read
+        index_path: SQLite index file (default: <vcd_path>.idx)
+        rebuild: rebuild the index even if it is up to date
+    """
+
+    def __init__(self, vcd_path, index_path=None, rebuild=False):
+        self.vcd_path = Path(vcd_path)
+        self.index_path = (
+            Path(index_path)
+            if index_path is not None
+            else self.vcd_path.with_name(self.vcd_path.name + ".idx")
+        )
+        stat = self.vcd_path.stat()
+        self._source_id = f"{stat.st_size}:{stat.st_mtime_ns}"
+
+        if rebuild or not self._index_is_current():
+            self._build()
+        self._db = sqlite3.connect(self.index_path)
+        self.timescale_fs = int(self._meta("timescale_fs"))
+        # few signals compared to changes: keep the name table in memory
+        self._signals = dict(self._db.execute("SELECT name, code FROM signals"))
+
+    def close(self) -> None:
+        self._db.close()
+
+    def _meta(self, key):
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _index_is_current(self) -> bool:
+        if not self.index_path.is_file():
+            return False
+        try:
+            with sqlite3.connect(self.index_path) as db:
+                row = db.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+        except sqlite3.DatabaseError:
+            return False
+        return row is not None and row[0] == self._source_id
+
+    # --------------------------------------------------------------- building
+    def _build(self) -> None:
+        tmp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+        if tmp_path.exists():
+            tmp_path.unlink()
+        db = sqlite3.connect(tmp_path)
+        db.executescript(_SCHEMA)
+        # the index is rebuilt from scratch on failure, no need for a journal
+        db.execute("PRAGMA journal_mode = OFF")
+        db.execute("PRAGMA synchronous = OFF")
+
+        with open(self.vcd_path) as vcd:
+            codes, timescale_fs = self._parse_header(vcd, db)
+            self._parse_changes(vcd, db, codes)
+
+        db.execute("CREATE INDEX changes_by_signal ON changes (code, time)")
+        db.executemany(
+            "INSERT INTO meta VALUES (?, ?)",
+            [("source", self._source_id), ("timescale_fs", str(timescale_fs))],
+        )
+        db.commit()
+        db.close()
+        os.replace(tmp_path, self.index_path)
+
+    @staticmethod
+    def _parse_header(vcd, db):
+        """Read the declarations, return the {identifier code: number} map and timescale."""
+        tokens = []
+        for line in vcd:
+            tokens += line.split()
+            if "$enddefinitions" in line:
+                break
+
+        codes, scopes, signals = {}, [], []
+        timescale_fs = 1
+        index = 0
+        while index < len(tokens):
+            token = tokens[index]
+            end = tokens.index("$end", index)
+            if token == "$scope":
+                scopes.append(tokens[index + 2])
+            elif token == "$upscope":
+                scopes.pop()
+            elif token == "$var":
+                width, code, reference = tokens[index + 2 : index + 5]
+                # the bit range may be glued to the name: sqrt_res[3:0]
+                name = ".".join(scopes + [reference.split("[")[0]])
+                code_number = codes.setdefault(code, len(codes))
+                signals.append((name, code_number, int(width)))
+            elif token == "$timescale":
+                timescale_fs = parse_time_fs("".join(tokens[index + 1 : end]))
+            index = end + 1
+
+        db.executemany("INSERT OR REPLACE INTO signals VALUES (?, ?, ?)", signals)
+        return codes, timescale_fs
+
+    @staticmethod
+    def _parse_changes(vcd, db, codes) -> None:
+        batch = []
+        time = 0
+        for line in vcd:
+            first = line[:1]
+            if first == "#":
+                time = int(line[1:])
+                continue
+            if first in ("b", "B", "r", "R"):
+                value, code = line[1:].split()
+            elif first in ("0", "1", "x", "X", "z", "Z", "u", "U", "-"):
+                value, code = first.lower(), line[1:].strip()
+            else:
+                # $dumpvars, $end, $comment, empty lines
+                continue
+            batch.append((codes[code], time, value))
+            if len(batch) >= BATCH_SIZE:
+                db.executemany("INSERT INTO changes VALUES (?, ?, ?)", batch)
+                batch.clear()
+        db.executemany("INSERT INTO changes VALUES (?, ?, ?)", batch)
+
+    # ---------------------------------------------------------------- queries
+    def ticks(self, time):
+        """Convert a time ("10us", or ticks already) to VCD ticks."""
+        if isinstance(time, str):
+            return parse_time_fs(time) // self.timescale_fs
+        return time
+
+    def signal_names(self):
+        return sorted(self._signals)
+
+    def _code(self, name):
+        if name in self._signals:
+            return self._signals[name]
+        matches = {
+            full_name: code
+            for full_name, code in self._signals.items()
+            if full_name.endswith("." + name)
+        }
+        if not matches:
+            raise KeyError(f"no signal {name!r} in {self.vcd_path}")
+        # aliases (a port and the signal it is connected to) share their code
+        if len(set(matches.values())) > 1:
+            raise KeyError(f"signal name {name!r} is ambiguous: {', '.join(matches)}")
+        return next(iter(matches.values()))
+
+    def transitions(self, name, t0=None, t1=None):
+        """Return the (time, value) changes of a signal, with t0 <= time <= t1."""
+        return self._changes(name, t0, t1).fetchall()
+
+    def _changes(self, name, t0=None, t1=None):
+        query = "SELECT time, value FROM changes WHERE code = ?"
+        arguments = [self._code(name)]
+        if t0 is not None:
+            query += " AND time >= ?"
+            arguments.append(self.ticks(t0))
+        if t1 is not None:
+            query += " AND time <= ?"
+            arguments.append(self.ticks(t1))
+        return self._db.execute(query + " ORDER BY time, rowid", arguments)
+
+    def value_at(self, name, time):
+        """Return the value of a signal at a time, changes at that time included."""
+        return self._last_value(name, "<=", time)
+
+    def _last_value(self, name, operator, time):
+        row = self._db.execute(
+            f"SELECT value FROM changes WHERE code = ? AND time {operator} ? "
+            "ORDER BY time DESC, rowid DESC LIMIT 1",
+            (self._code(name), self.ticks(time)),
+        ).fetchone()
+        return row[0] if row else None
+
+    def edges(self, name, rising=True, t0=None, t1=None):
+        """Return the times of the rising (or falling) edges of a 1-bit signal."""
+        target, times = ("1" if rising else "0"), []
+        # value before the window, so an edge at its first change counts
+        previous = None if t0 is None else self._last_value(name, "<", t0)
+        for time, value in self._changes(name, t0, t1):
+            if value == target and previous not in (None, target):
+                times.append(time)
+            previous = value
+        return times
+
+    def sample_on_edges(self, name, strobe, rising=True, t0=None, t1=None):
+        """
+        Return the (time, value) of a signal at each edge of a strobe signal.
+
+        Changes of the signal at the time of the edge are included, which is
+        the registered-output convention of the lab designs (data and valid
+        updated by the same clock edge). Both signals are walked in a single
+        ordered pass over the index.
+        """
+        edge_times = self.edges(strobe, rising, t0, t1)
+        if not edge_times:
+            return []
+        changes = self._db.execute(
+            "SELECT time, value FROM changes WHERE code = ? AND time <= ? "
+            "ORDER BY time, rowid",
+            (self._code(name), edge_times[-1]),
+        )
+        samples, value = [], None
+        change = next(changes, None)
+        for edge_time in edge_times:
+            while change is not None and change[0] <= edge_time:
+                value = change[1]
+                change = next(changes, None)
+            samples.append((edge_time, value))
+        return samples
+
+    def latencies(self, start, end, rising=True):
+        """Return the delays, in ticks, from each start edge to the matching end edge (FIFO order)."""
+        return [
+            end_time - start_time
+            for start_time, end_time in zip(self.edges(start, rising), self.edges(end, rising))
+        ]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Query a VCD file through its index.")
+    parser.add_argument("vcd", help="VCD file")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the index")
+    parser.add_argument("--list", action="store_true", help="list the signals")
+    parser.add_argument("--transitions", metavar="SIGNAL", help="print the changes of SIGNAL")
+    parser.add_argument("--sample", metavar="SIGNAL", help="print SIGNAL at each edge of --on")
+    parser.add_argument("--on", metavar="STROBE", help="strobe signal of --sample")
+    parser.add_argument(
+        "--latency", nargs=2, metavar=("START", "END"), help="delays from START to END edges"
+    )
+    parser.add_argument("--from", dest="t0", help="start time, i.e. 10us")
+    parser.add_argument("--to", dest="t1", help="end time, i.e. 20us")
+    args = parser.parse_args(argv)
+
+    vcd = VcdIndex(args.vcd, rebuild=args.rebuild)
+    if args.list:
+        print("\n".join(vcd.signal_names()))
+    if args.transitions:
+        for time, value in vcd.transitions(args.transitions, args.t0, args.t1):
+            print(time, value)
+    if args.sample:
+        if not args.on:
+            parser.error("--sample needs --on")
+        for time, value in vcd.sample_on_edges(args.sample, args.on, t0=args.t0, t1=args.t1):
+            print(time, value, int_value(value))
+    if args.latency:
+        delays = vcd.latencies(*args.latency)
+        if delays:
+            print(f"{len(delays)} transactions, min {min(delays)}, max {max(delays)} ticks")
+    vcd.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
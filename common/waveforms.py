@@ -0,0 +1,261 @@
+# This file is public domain, it can be freely copied without restrictions.
+# SPDX-License-Identifier: CC0-1.0
+"""
+Waveform dumping control for the lab runners and tests.
+
+Dumping is off unless requested. The settings are environment variables, so
+they reach both the runner (simulator options) and the cocotb tests:
+
+    WAVES=vcd|ghw|fst             format of the waveform file (unset or 0: off)
+    WAVES_SCOPE=inst_square_root  only dump this hierarchy of the toplevel
+                                  (dotted path for deeper instances)
+    WAVES_WINDOW=10us:2ms,3ms:    only keep these simulation time windows
+    WAVES_WINDOW=events           only keep the windows opened by the tests
+                                  with waveform_window_start/stop
+
+GHDL cannot switch dumping on and off while it runs, so time windows are
+applied to VCD files after the simulation, by a streaming trim that keeps
+memory bounded. GHW and FST files are compact already and are not trimmed;
+use WAVES_SCOPE to reduce them.
+
+Runner side:
+
+    plusargs = waveform_plusargs("Lab06_waveforms", "rt2024mysystemtop", build_dir)
+    results_xml = runner.test(..., plusargs=plusargs + ["--ieee-asserts=disable"])
+    trim_waveform(results_xml.parent, "Lab06_waveforms")
+
+Test side (only active with WAVES_WINDOW=events):
+
+    waveform_window_start()
+    await self.test()
+    waveform_window_stop()
+"""
+
+import math
+import os
+import re
+from pathlib import Path
+
+# simulator option and file extension, per format
+WAVE_FORMATS = {
+    "vcd": ("--vcd", ".vcd"),
+    "ghw": ("--wave", ".ghw"),
+    "fst": ("--fst", ".fst"),
+}
+
+# window events written by the tests, in the simulator working directory
+EVENTS_FILE = "waveform_windows.txt"
+
+_UNITS_FS = {"fs": 1, "ps": 10**3, "ns": 10**6, "us": 10**9, "ms": 10**12, "s": 10**15}
+
+
+def waveform_format():
+    """Return the requested waveform format, or None when dumping is off."""
+    fmt = os.getenv("WAVES", "0").strip().lower()
+    if fmt in ("", "0", "none", "off"):
+        return None
+    # WAVES=1 is the cocotb makefile convention
+    if fmt == "1":
+        return "vcd"
+    if fmt not in WAVE_FORMATS:
+        raise ValueError(f"WAVES={fmt!r}: expected one of {', '.join(WAVE_FORMATS)}")
+    return fmt
+
+
+def waveform_plusargs(basename, hdl_toplevel, build_dir="sim_build"):
+    """
+    Return the simulator options for the requested waveform dump.
+
+    Args
+        basename: waveform file name, without extension
+        hdl_toplevel: name of the toplevel, root of WAVES_SCOPE
+        build_dir: directory where the GHDL wave option file is written
+    """
+    fmt = waveform_format()
+    if fmt is None:
+        return []
+    option, extension = WAVE_FORMATS[fmt]
+    plusargs = [f"{option}={basename}{extension}"]
+
+    scope = os.getenv("WAVES_SCOPE", "").strip()
+    if scope:
+        path = "/".join([hdl_toplevel.lower()] + scope.split("."))
+        wave_opt = Path(build_dir).resolve() / f"{basename}.wave-opt"
+        wave_opt.parent.mkdir(parents=True, exist_ok=True)
+        wave_opt.write_text(f"$ version 1.1\n/{path}/*\n")
+        plusargs.append(f"--read-wave-opt={wave_opt}")
+    return plusargs
+
+
+def parse_time_fs(text):
+    """Convert a time such as "10us" or "2.5 ms" to femtoseconds."""
+    match = re.fullmatch(r"\s*([0-9.]+)\s*(fs|ps|ns|us|ms|s)\s*", text)
+    if match is None:
+        raise ValueError(f"invalid time {text!r}, expected i.e. 10us")
+    return round(float(match.group(1)) * _UNITS_FS[match.group(2)])
+
+
+def parse_windows(text):
+    """Parse "start:stop,start:" windows in femtoseconds (open end: infinity)."""
+    windows = []
+    for window in text.split(","):
+        start, _, stop = window.partition(":")
+        windows.append(
+            (
+                parse_time_fs(start) if start.strip() else 0,
+                parse_time_fs(stop) if stop.strip() else math.inf,
+            )
+        )
+    return windows
+
+
+def _window_events_enabled():
+    return os.getenv("WAVES_WINDOW", "").strip().lower() == "events"
+
+
+# the first event of a simulation truncates the events file
+_events_started = False
+
+
+def _write_window_event(kind):
+    # imported here, so the runner side does not need a simulator
+    from cocotb.utils import get_sim_time
+
+    global _events_started
+    mode = "a" if _events_started else "w"
+    _events_started = True
+    with open(EVENTS_FILE, mode) as events:
+        events.write(f"{kind} {get_sim_time('fs')}\n")
+
+
+def waveform_window_start():
+    """Open a waveform window at the current simulation time (WAVES_WINDOW=events)."""
+    if _window_events_enabled() and waveform_format() is not None:
+        _write_window_event("start")
+
+
+def waveform_window_stop():
+    """Close the waveform window opened by waveform_window_start()."""
+    if _window_events_enabled() and waveform_format() is not None:
+        _write_window_event("stop")
+
+
+def read_window_events(events_file):
+    """Return the windows recorded by the tests, in femtoseconds."""
+    windows, start = [], None
+    for line in Path(events_file).read_text().splitlines():
+        kind, time_fs = line.split()
+        if kind == "start" and start is None:
+            start = int(time_fs)
+        elif kind == "stop" and start is not None:
+            windows.append((start, int(time_fs)))
+            start = None
+    if start is not None:
+        windows.append((start, math.inf))
+    return windows
+
+
+def _vcd_timescale_fs(header):
+    match = re.search(r"\$timescale\s+([0-9]+)\s*(fs|ps|ns|us|ms|s)\s+\$end", header)
+    if match is None:
+        return 1
+    return int(match.group(1)) * _UNITS_FS[match.group(2)]
+
+
+def trim_vcd(vcd_path, windows, out_path=None):
+    """
+    Keep only the given time windows of a VCD file, in one streaming pass.
+
+    Args
+        vcd_path: VCD file to trim
+        windows: list of (start, stop) times in femtoseconds
+        out_path: trimmed file (default: replace vcd_path)
+
+    Each kept window starts with a $dumpvars snapshot of all signals, so
+    viewers show correct values from the first time of the window.
+    """
+    vcd_path = Path(vcd_path)
+    out_path = Path(out_path) if out_path is not None else vcd_path
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+
+    # merge overlapping windows, the output times must keep increasing
+    merged = []
+    for start, stop in sorted(windows):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+        else:
+            merged.append((start, stop))
+
+    with open(vcd_path) as vcd, open(tmp_path, "w") as out:
+        header = []
+        for line in vcd:
+            header.append(line)
+            if "$enddefinitions" in line:
+                break
+        out.writelines(header)
+        scale = _vcd_timescale_fs("".join(header))
+        ticks = [(start / scale, stop / scale) for start, stop in merged]
+
+        # last value of every signal, by identifier code
+        current = {}
+        window_index, in_window = 0, False
+        for line in vcd:
+            if line.startswith("#"):
+                time = int(line[1:])
+                while window_index < len(ticks) and ticks[window_index][1] < time:
+                    window_index += 1
+                    in_window = False
+                if window_index == len(ticks):
+                    # past the last window, nothing else to keep
+                    break
+                start, _ = ticks[window_index]
+                if time >= start and not in_window:
+                    # open the window with the values at its start
+                    in_window = True
+                    out.write(f"#{max(math.ceil(start), 0)}\n$dumpvars\n")
+                    out.writelines(current.values())
+                    out.write("$end\n")
+                    if time > start:
+                        out.write(line)
+                elif in_window:
+                    out.write(line)
+                continue
+
+            stripped = line.strip()
+            if not stripped or stripped.startswith("$"):
+                continue
+            if stripped[0] in "bBrR":
+                code = stripped.split()[-1]
+            else:
+                code = stripped[1:]
+            current[code] = line if line.endswith("\n") else line + "\n"
+            if in_window:
+                out.write(current[code])
+
+    os.replace(tmp_path, out_path)
+
+
+def trim_waveform(test_dir, basename):
+    """
+    Apply WAVES_WINDOW to the waveform file written by a test run.
+
+    Args
+        test_dir: directory the simulator ran in (the results file directory)
+        basename: waveform file name, without extension
+    """
+    events_file = Path(test_dir) / EVENTS_FILE
+    setting = os.getenv("WAVES_WINDOW", "").strip()
+    vcd_path = Path(test_dir) / f"{basename}.vcd"
+    try:
+        if not setting or waveform_format() != "vcd" or not vcd_path.is_file():
+            return
+        if setting.lower() == "events":
+            if not events_file.is_file():
+                return
+            windows = read_window_events(events_file)
+        else:
+            windows = parse_windows(setting)
+        trim_vcd(vcd_path, windows)
+    finally:
+        if events_file.is_file():
+            events_file.unlink()